@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "drf_spectacular",
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
     "user.apps.UserConfig",
     "authentication",
     "core",
+    "jobs",
 ]
 
 MIDDLEWARE = [
@@ -135,6 +137,36 @@ MEDIA_URL = "/static/media/"
 STATIC_ROOT = "/vol/web/static"
 MEDIA_ROOT = "/vol/web/media"
 
+# collectstatic writes hashed names with gzip/brotli copies of text files
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "core.storage.CompressedManifestStaticFilesStorage"},
+}
+STATIC_COMPRESS_EXTENSIONS = [".css", ".js", ".map", ".json", ".svg", ".txt", ".html"]
+# Bytes of the smallest file worth compressing
+STATIC_COMPRESS_MIN_SIZE = 256
+
+# Seconds clients cache static and media files served by core.serving,
+# names changing with content are cached for a year
+FILES_MAX_AGE = 60
+FILES_IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+# Internal location prefix to hand files off to nginx by X-Accel-Redirect,
+# e.g. "/protected" with "location /protected/static/ { internal; alias /vol/web/; }"
+FILES_ACCEL_REDIRECT_PREFIX = os.environ.get("FILES_ACCEL_REDIRECT_PREFIX", "")
+
+# Max widths of resized WebP and JPEG copies made of uploaded images
+IMAGE_DERIVATIVE_WIDTHS = {"thumbnail": 150, "card": 300, "detail": 800}
+IMAGE_DERIVATIVE_QUALITY = 80
+
+# Limits of images uploaded through core.uploads.ImageUploadParser, they are
+# checked on the header while the file is received, before it is decoded
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_UPLOAD_MAX_DIMENSIONS = (8000, 8000)
+IMAGE_UPLOAD_MAX_PIXELS = 40_000_000
+IMAGE_UPLOAD_FORMATS = ["JPEG", "PNG", "WEBP", "GIF"]
+# Bytes of the file beginning the image header must be found within
+IMAGE_UPLOAD_HEADER_SIZE = 1024 * 1024
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -145,8 +177,74 @@ REST_FRAMEWORK = {
     # Configure pagination
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 100,
+    "DEFAULT_THROTTLE_RATES": {
+        # Revoked token ids are kept in memory of each process
+        "token-revoke": "30/minute",
+    },
+}
+
+# Local memory cache by default, set CACHE_BACKEND and CACHE_LOCATION
+# to use e.g. django.core.cache.backends.filebased.FileBasedCache.
+# Web and worker processes have to share the backend, model versions
+# bumped by jobs invalidate cached responses and ETags of the web ones
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
 }
 
+# Seconds to keep responses of public catalog endpoints in cache,
+# they are invalidated by model versions before that on any change
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+# Seconds to keep expired responses to serve them while one worker
+# recomputes the fresh one
+CACHE_STALE_TIMEOUT = 60
+# Seconds other workers wait for the one recomputing missing response
+CACHE_STAMPEDE_WAIT_TIMEOUT = 2
+# Seconds to hold the recompute lock in case worker dies without release
+CACHE_STAMPEDE_LOCK_TIMEOUT = 10
+# Higher values recompute responses earlier before expiry, 0 disables it
+CACHE_EARLY_EXPIRY_BETA = 1.0
+
+# Paginated lists above this number of rows get planner estimated count
+# instead of exact COUNT(*)
+PAGINATION_ESTIMATE_THRESHOLD = 10000
+# Seconds to keep exact counts of paginated lists in cache
+PAGINATION_COUNT_CACHE_TIMEOUT = 30
+
+# Default and max number of product autocomplete suggestions
+PRODUCT_AUTOCOMPLETE_LIMIT = 8
+PRODUCT_AUTOCOMPLETE_MAX_LIMIT = 20
+# Number of most recent autocomplete prefixes kept in memory of each process
+PRODUCT_AUTOCOMPLETE_CACHE_SIZE = 1000
+# Number of products fetched from server-side cursor at once by export
+PRODUCT_EXPORT_CHUNK_SIZE = 2000
+# Number of imported products validated and upserted at once
+PRODUCT_IMPORT_BATCH_SIZE = 1000
+
+# Number of processes started by run_workers command
+JOB_WORKER_PROCESSES = 2
+# Seconds idle worker waits before checking for due jobs again
+JOB_POLL_INTERVAL = 1
+# Failed jobs are retried after 10, 20, 40... seconds up to max attempts
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 10
+# Seconds after which running job is considered abandoned by dead worker
+JOB_LOCK_TIMEOUT = 10 * 60
+
+# Seconds to keep database token with its user in cache
+AUTH_TOKEN_CACHE_TIMEOUT = 5 * 60
+
+# Lifetime in seconds of signed access and refresh tokens
+SIGNED_TOKEN_ACCESS_LIFETIME = 5 * 60
+SIGNED_TOKEN_REFRESH_LIFETIME = 24 * 60 * 60
+# Max number of revoked signed tokens kept in memory of each process,
+# used refresh tokens are kept in the shared cache instead
+SIGNED_TOKEN_REVOCATION_LIST_SIZE = 10000
+
 SPECTACULAR_SETTINGS = {
     # This lets to use file input in swagger
     "COMPONENT_SPLIT_REQUEST": True,
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+# Static and media files are served before requests reach Django
+from core.serving import FileServer  # noqa: E402
+
+application = FileServer(application)
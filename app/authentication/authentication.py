@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from .tokens import verify_access_token
+
+
+class TokenUser(SimpleLazyObject):
+    """
+    User built from signed token claims. It loads the user from database
+    only when something beyond id and staff flag is accessed
+    """
+
+    def __init__(self, claims):
+        user_id = claims["uid"]
+        super().__init__(lambda: get_user_model().objects.get(pk=user_id))
+        self.__dict__.update(
+            id=user_id,
+            pk=user_id,
+            is_staff=claims["staff"],
+            is_active=True,
+            is_anonymous=False,
+            is_authenticated=True,
+        )
+
+    # Authenticated user is always truthy, no need to load it for that
+    def __bool__(self):
+        return True
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """
+    Authenticate with HMAC signed access token passed in
+    "Authorization: Bearer <token>" header without database lookup
+    """
+
+    keyword = "Bearer"
+
+    def authenticate_credentials(self, key):
+        try:
+            claims = verify_access_token(key)
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed("Token expired.")
+        except (signing.BadSignature, KeyError, TypeError):
+            raise exceptions.AuthenticationFailed("Invalid token.")
+
+        return (TokenUser(claims), claims)
+
+
+def get_token_cache_key(key):
+    return f"auth-token:{key}"
+
+
+def get_user_token_cache_key(user_id):
+    return f"auth-token-user:{user_id}"
+
+
+def invalidate_user_tokens(user_id):
+    """Drop cached token of the user so it's reloaded with fresh user data"""
+    key = cache.get(get_user_token_cache_key(user_id))
+    if key is not None:
+        cache.delete_many([get_token_cache_key(key), get_user_token_cache_key(user_id)])
+
+
+def record_token_cache_lookup(hit):
+    counter = "auth-token-cache:hits" if hit else "auth-token-cache:misses"
+    cache.add(counter, 0, timeout=None)
+    try:
+        cache.incr(counter)
+    except ValueError:
+        # Counter was evicted between add and incr
+        pass
+
+
+def get_token_cache_stats():
+    """Get token cache hits and misses counted so far"""
+    return {
+        "hits": cache.get("auth-token-cache:hits", 0),
+        "misses": cache.get("auth-token-cache:misses", 0),
+    }
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication which keeps id and staff flag of the token user
+    in cache for AUTH_TOKEN_CACHE_TIMEOUT to skip database lookup per
+    request. The rest of the user is loaded only when accessed
+    """
+
+    def authenticate_credentials(self, key):
+        claims = cache.get(get_token_cache_key(key))
+        record_token_cache_lookup(hit=claims is not None)
+        if claims is not None:
+            return (TokenUser(claims), self.get_model()(key=key, user_id=claims["uid"]))
+
+        user, token = super().authenticate_credentials(key)
+        timeout = settings.AUTH_TOKEN_CACHE_TIMEOUT
+        # Whole user would put the password hash into the cache
+        claims = {"uid": user.pk, "staff": user.is_staff}
+        cache.set_many(
+            {
+                get_token_cache_key(key): claims,
+                get_user_token_cache_key(user.pk): key,
+            },
+            timeout,
+        )
+        return (user, token)
@@ -0,0 +1,36 @@
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from authentication.authentication import get_token_cache_stats
+
+
+class Command(BaseCommand):
+    """Django command to report authentication token cache hits and misses"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset counters after reporting",
+        )
+
+    def handle(self, *args, **options):
+        # Counters of serving processes can't be read from other process
+        if isinstance(caches["default"], (LocMemCache, DummyCache)):
+            raise CommandError(
+                "Token cache counters need a cache backend shared by processes, "
+                "set CACHE_BACKEND and CACHE_LOCATION."
+            )
+
+        stats = get_token_cache_stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_ratio = stats["hits"] / lookups if lookups else 0
+        self.stdout.write(
+            f"Hits: {stats['hits']}, misses: {stats['misses']}, "
+            f"hit ratio: {hit_ratio:.1%}"
+        )
+
+        if options["reset"]:
+            cache.delete_many(["auth-token-cache:hits", "auth-token-cache:misses"])
+            self.stdout.write(self.style.SUCCESS("Counters reset!"))
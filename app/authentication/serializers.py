@@ -1,5 +1,8 @@
+from django.core import signing
+from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from rest_framework.authentication import authenticate
+from .tokens import revoke_token, use_refresh_token, verify_refresh_token
 
 
 class AuthTokenSeralizer(serializers.Serializer):
@@ -14,3 +17,33 @@ class AuthTokenSeralizer(serializers.Serializer):
             raise serializers.ValidationError("Incorrect credentials!")
         attrs["user"] = user
         return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        try:
+            claims = verify_refresh_token(attrs["refresh"])
+        except (signing.BadSignature, KeyError, TypeError):
+            raise serializers.ValidationError("Invalid or expired refresh token!")
+
+        # Ensure the user wasn't deleted since the token issued
+        user = get_user_model().objects.filter(pk=claims["uid"]).first()
+        if user is None or not user.is_active:
+            raise serializers.ValidationError("User inactive or deleted!")
+
+        # Each refresh token can be used only once
+        if not use_refresh_token(claims):
+            raise serializers.ValidationError("Invalid or expired refresh token!")
+        attrs["user"] = user
+        return attrs
+
+
+class RevokeTokenSerializer(serializers.Serializer):
+    token = serializers.CharField()
+
+    def validate_token(self, value):
+        if not revoke_token(value):
+            raise serializers.ValidationError("Invalid token!")
+        return value
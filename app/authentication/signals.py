@@ -0,0 +1,13 @@
+from django.dispatch import receiver
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from rest_framework.authtoken.models import Token
+from .authentication import invalidate_user_tokens
+
+
+# Drop cached token whenever it's deleted or its user is changed
+@receiver(post_delete, sender=Token)
+@receiver(post_save, sender=get_user_model())
+def invalidate_cached_token(sender, instance, **kwargs):
+    user_id = instance.user_id if sender is Token else instance.pk
+    invalidate_user_tokens(user_id)
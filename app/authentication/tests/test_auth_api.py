@@ -1,13 +1,28 @@
-from django.test import TestCase
+import tempfile
+import time
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework.throttling import ScopedRateThrottle
 from user.serializers import UserRegisterSerializer
 from user.tests.test_models import create_user
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from authentication.tokens import RevocationList, revoked_tokens
+from authentication.authentication import get_token_cache_key, get_token_cache_stats
 
 CREATE_USER_URL = reverse("authentication:register")
 CREATE_TOKEN_URL = reverse("authentication:token")
+REFRESH_TOKEN_URL = reverse("authentication:token-refresh")
+REVOKE_TOKEN_URL = reverse("authentication:token-revoke")
+CART_URL = reverse("user:cartitem-list")
+ME_URL = reverse("user:me")
 
 
 class AuthAPITests(TestCase):
@@ -84,3 +99,211 @@ class AuthAPITests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertNotIn("token", res.data)
+
+
+class SignedTokenAPITests(TestCase):
+    """Test signed access and refresh tokens"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.credentials = {
+            "email": "test@example.com",
+            "password": "testpass",
+        }
+        self.user = create_user(**self.credentials)
+        revoked_tokens.clear()
+        cache.clear()
+
+    def obtain_tokens(self):
+        return self.client.post(CREATE_TOKEN_URL, self.credentials).data
+
+    def test_generate_signed_tokens(self):
+        """Test signed tokens are issued along with database token"""
+        tokens = self.obtain_tokens()
+
+        self.assertIn("token", tokens)
+        self.assertIn("access", tokens)
+        self.assertIn("refresh", tokens)
+
+    def test_authenticate_without_token_lookup(self):
+        """Test access token is verified without querying database"""
+        access = self.obtain_tokens()["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+        # Only count query of the empty cart
+        with self.assertNumQueries(1):
+            res = self.client.get(CART_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    def test_database_token_still_works(self):
+        """Test database token authenticates along with signed ones"""
+        token = self.obtain_tokens()["token"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_invalid_access_token_error(self):
+        """Test tampered or refresh token can't be used as access token"""
+        tokens = self.obtain_tokens()
+        for token in [tokens["access"] + "x", tokens["refresh"]]:
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            res = self.client.get(ME_URL)
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(SIGNED_TOKEN_ACCESS_LIFETIME=-1)
+    def test_expired_access_token_error(self):
+        """Test expired access token is rejected"""
+        access = self.obtain_tokens()["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoke_access_token(self):
+        """Test revoked access token is rejected"""
+        access = self.obtain_tokens()["access"]
+        res = self.client.post(REVOKE_TOKEN_URL, {"token": access})
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_tokens(self):
+        """Test refresh token is exchanged for new pair only once"""
+        refresh = self.obtain_tokens()["refresh"]
+        res = self.client.post(REFRESH_TOKEN_URL, {"refresh": refresh})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_200_OK)
+        res = self.client.post(REFRESH_TOKEN_URL, {"refresh": refresh})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(SIGNED_TOKEN_ACCESS_LIFETIME=-1)
+    def test_revoke_expired_token_error(self):
+        """Test expired token isn't accepted to the revocation list"""
+        access = self.obtain_tokens()["access"]
+        res = self.client.post(REVOKE_TOKEN_URL, {"token": access})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch.object(ScopedRateThrottle, "THROTTLE_RATES", {"token-revoke": "1/minute"})
+    def test_revoke_throttled(self):
+        """Test revocation list can't be flooded by one client"""
+        tokens = self.obtain_tokens()
+        res = self.client.post(REVOKE_TOKEN_URL, {"token": tokens["access"]})
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        res = self.client.post(REVOKE_TOKEN_URL, {"token": tokens["refresh"]})
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_refresh_token_used_in_other_process_error(self):
+        """Test used refresh token is rejected by processes not seen it used"""
+        refresh = self.obtain_tokens()["refresh"]
+        res = self.client.post(REFRESH_TOKEN_URL, {"refresh": refresh})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        # Revocation list of other process is empty
+        revoked_tokens.clear()
+        res = self.client.post(REFRESH_TOKEN_URL, {"refresh": refresh})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh_deleted_user_error(self):
+        """Test deleted user can't refresh tokens"""
+        refresh = self.obtain_tokens()["refresh"]
+        self.user.delete()
+        res = self.client.post(REFRESH_TOKEN_URL, {"refresh": refresh})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RevocationListTests(SimpleTestCase):
+    """Test in-process list of revoked token ids"""
+
+    def test_expired_ids_dropped_before_evicting(self):
+        """Test ids of tokens still in effect outlive expired ones"""
+        revocations = RevocationList(max_size=2)
+        now = time.time()
+        revocations.revoke("valid", now + 60)
+        revocations.revoke("expired", now - 1)
+        revocations.revoke("new", now + 60)
+
+        self.assertTrue(revocations.is_revoked("valid"))
+        self.assertTrue(revocations.is_revoked("new"))
+        revocations.revoke("newest", now + 60)
+        self.assertFalse(revocations.is_revoked("valid"))
+
+
+class CachedTokenAPITests(TestCase):
+    """Test caching database token with its user"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        cache.clear()
+
+    def test_token_lookup_cached(self):
+        """Test token is looked up in database only once"""
+        self.client.get(CART_URL)
+
+        # Only count query of the empty cart
+        with self.assertNumQueries(1):
+            res = self.client.get(CART_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_token_cache_stats(), {"hits": 1, "misses": 1})
+
+    def test_cached_token_without_user_data(self):
+        """Test only user id and staff flag are kept in cache"""
+        self.client.get(ME_URL)
+
+        self.assertEqual(
+            cache.get(get_token_cache_key(self.token.key)),
+            {"uid": self.user.pk, "staff": False},
+        )
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    def test_cache_stats_command_needs_shared_cache(self):
+        """Test counters aren't reported from process local cache"""
+        with self.assertRaises(CommandError):
+            call_command("token_cache_stats", stdout=StringIO())
+
+        with tempfile.TemporaryDirectory() as location:
+            shared_cache = {
+                "default": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": location,
+                }
+            }
+            with override_settings(CACHES=shared_cache):
+                self.client.get(CART_URL)
+                self.client.get(CART_URL)
+                out = StringIO()
+                call_command("token_cache_stats", stdout=out)
+
+        self.assertIn("Hits: 1, misses: 1, hit ratio: 50.0%", out.getvalue())
+
+    def test_cache_invalidated_on_user_update(self):
+        """Test updated user data is returned after profile update"""
+        self.client.get(ME_URL)
+        res = self.client.patch(ME_URL, {"name": "new name"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.data["name"], "new name")
+
+    def test_cache_invalidated_on_token_delete(self):
+        """Test deleted token can't be used anymore"""
+        self.client.get(ME_URL)
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
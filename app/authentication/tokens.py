@@ -0,0 +1,129 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from uuid import uuid4
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+ACCESS_TOKEN_SALT = "authentication.access"
+REFRESH_TOKEN_SALT = "authentication.refresh"
+
+
+class RevocationList:
+    """
+    Small in-process list of revoked token ids. Each id is kept only until
+    the token would expire anyway and the oldest ids are dropped when full
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._expires = OrderedDict()
+        self._lock = Lock()
+
+    def revoke(self, token_id, expires_at):
+        with self._lock:
+            self._expires[token_id] = expires_at
+            self._expires.move_to_end(token_id)
+            if len(self._expires) > self.max_size:
+                self._prune()
+            while len(self._expires) > self.max_size:
+                self._expires.popitem(last=False)
+
+    # Drop ids of expired tokens before evicting ones still in effect
+    def _prune(self):
+        now = time.time()
+        expired = [key for key, expires_at in self._expires.items() if expires_at < now]
+        for token_id in expired:
+            del self._expires[token_id]
+
+    def is_revoked(self, token_id):
+        with self._lock:
+            expires_at = self._expires.get(token_id)
+            if expires_at is None:
+                return False
+            if expires_at < time.time():
+                del self._expires[token_id]
+                return False
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._expires.clear()
+
+
+revoked_tokens = RevocationList(settings.SIGNED_TOKEN_REVOCATION_LIST_SIZE)
+
+
+def _issue_token(user, salt, lifetime):
+    claims = {
+        "uid": user.pk,
+        "staff": user.is_staff,
+        "jti": uuid4().hex,
+        "exp": int(time.time()) + lifetime,
+    }
+    return signing.dumps(claims, salt=salt)
+
+
+def issue_token_pair(user):
+    """Issue short-lived access token and longer-lived refresh token"""
+    return {
+        "access": _issue_token(
+            user, ACCESS_TOKEN_SALT, settings.SIGNED_TOKEN_ACCESS_LIFETIME
+        ),
+        "refresh": _issue_token(
+            user, REFRESH_TOKEN_SALT, settings.SIGNED_TOKEN_REFRESH_LIFETIME
+        ),
+    }
+
+
+def _verify_token(token, salt):
+    claims = signing.loads(token, salt=salt)
+    if claims["exp"] < time.time():
+        raise signing.SignatureExpired("Token expired")
+    if revoked_tokens.is_revoked(claims["jti"]):
+        raise signing.BadSignature("Token revoked")
+    return claims
+
+
+def verify_access_token(token):
+    """Get claims of valid access token without touching the database"""
+    return _verify_token(token, ACCESS_TOKEN_SALT)
+
+
+def verify_refresh_token(token):
+    """Get claims of valid refresh token"""
+    claims = _verify_token(token, REFRESH_TOKEN_SALT)
+    if cache.get(get_used_refresh_token_cache_key(claims["jti"])):
+        raise signing.BadSignature("Token used")
+    return claims
+
+
+def get_used_refresh_token_cache_key(token_id):
+    return f"refresh-token-used:{token_id}"
+
+
+def use_refresh_token(claims):
+    """
+    Mark refresh token as used, False if it was used already. Kept in the
+    shared cache so the token can't be replayed once per server process
+    """
+    timeout = max(1, int(claims["exp"] - time.time()))
+    return cache.add(get_used_refresh_token_cache_key(claims["jti"]), True, timeout)
+
+
+def revoke_token(token):
+    """Revoke unexpired access or refresh token until it expires"""
+    for salt in [ACCESS_TOKEN_SALT, REFRESH_TOKEN_SALT]:
+        try:
+            claims = signing.loads(token, salt=salt)
+        except signing.BadSignature:
+            continue
+        # Expired tokens would only push revoked ones out of the list
+        if claims["exp"] < time.time():
+            return False
+        revoked_tokens.revoke(claims["jti"], claims["exp"])
+        if salt == REFRESH_TOKEN_SALT:
+            use_refresh_token(claims)
+        return True
+    return False
@@ -1,9 +1,16 @@
 from django.urls import path
-from .views import RegisterUserView, ObtainTokenView
+from .views import (
+    RegisterUserView,
+    ObtainTokenView,
+    RefreshTokenView,
+    RevokeTokenView,
+)
 
 app_name = "authentication"
 
 urlpatterns = [
     path("register/", RegisterUserView.as_view(), name="register"),
     path("token/", ObtainTokenView.as_view(), name="token"),
+    path("token/refresh/", RefreshTokenView.as_view(), name="token-refresh"),
+    path("token/revoke/", RevokeTokenView.as_view(), name="token-revoke"),
 ]
@@ -1,10 +1,19 @@
-from rest_framework.generics import CreateAPIView
+from rest_framework import generics
+from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
-from .serializers import AuthTokenSeralizer
+from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
+from .serializers import (
+    AuthTokenSeralizer,
+    RefreshTokenSerializer,
+    RevokeTokenSerializer,
+)
+from .tokens import issue_token_pair
 from user.serializers import UserRegisterSerializer
 
 
-class RegisterUserView(CreateAPIView):
+class RegisterUserView(generics.CreateAPIView):
     """Manage user creation"""
 
     serializer_class = UserRegisterSerializer
@@ -14,3 +23,37 @@ class ObtainTokenView(ObtainAuthToken):
     """Manage token creation and obtaining"""
 
     serializer_class = AuthTokenSeralizer
+
+    # Issue signed access and refresh tokens along with database token
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data["user"]
+        token, _ = Token.objects.get_or_create(user=user)
+        return Response({"token": token.key, **issue_token_pair(user)})
+
+
+class RefreshTokenView(generics.GenericAPIView):
+    """Exchange refresh token for a new pair of signed tokens"""
+
+    serializer_class = RefreshTokenSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data["user"]
+        return Response(issue_token_pair(user), status.HTTP_200_OK)
+
+
+class RevokeTokenView(generics.GenericAPIView):
+    """Revoke signed access or refresh token before it expires"""
+
+    serializer_class = RevokeTokenSerializer
+    # Anyone holding a token may revoke it, limit how many per client
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = "token-revoke"
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(status=status.HTTP_204_NO_CONTENT)
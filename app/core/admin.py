@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import StoredFile
 
-# Register your models here.
+
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ("name", "ref_count", "updated_at")
+    readonly_fields = ("name", "ref_count", "updated_at")
+
+
+admin.site.register(StoredFile, StoredFileAdmin)
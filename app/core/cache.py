@@ -0,0 +1,267 @@
+import math
+import random
+import time
+from collections import OrderedDict
+from hashlib import md5
+from threading import Lock
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+class LRUCache:
+    """Small in-process cache dropping least recently used values when full"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._values = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._values:
+                return default
+            self._values.move_to_end(key)
+            return self._values[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_size:
+                self._values.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+def get_model_version_key(model):
+    return f"model-version:{model._meta.label_lower}"
+
+
+def get_model_versions(models):
+    """Get current version of every model, starting missing ones"""
+    keys = [get_model_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from current time so a version lost from cache
+            # never matches responses cached with the previous one
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_versioned_cache_key(prefix, models, request):
+    """Build key from request url and current versions of the models"""
+    versions = ".".join(str(version) for version in get_model_versions(models))
+    url_hash = md5(request.build_absolute_uri().encode("utf-8")).hexdigest()
+    return f"{prefix}:{versions}:{url_hash}"
+
+
+def _increment_model_version(model):
+    key = get_model_version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_model_version(model):
+    """
+    Invalidate cached responses built from the model. Bump again after
+    commit since a concurrent request could read uncommitted version
+    with the old data and cache it under the new version
+    """
+    _increment_model_version(model)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _increment_model_version(model))
+
+
+def get_or_compute(key, compute, timeout):
+    """
+    Get value from cache or store the one returned by compute(),
+    unless it's None. Only one caller recomputes the key at once
+    while others get the stale value or wait for the fresh one.
+    Value is recomputed a bit before expiry with probability
+    growing with time left and cost of computation (XFetch)
+    """
+    entry = cache.get(key)
+    if entry is not None and not _should_recompute(entry):
+        return entry["value"]
+
+    lock_key = f"{key}:lock"
+    if not cache.add(lock_key, 1, settings.CACHE_STAMPEDE_LOCK_TIMEOUT):
+        if entry is not None:
+            # Serve stale value while other worker revalidates
+            return entry["value"]
+        entry = _wait_for_entry(key, lock_key)
+        if entry is not None:
+            return entry["value"]
+        # Lock holder failed or is too slow, compute it here
+        return _compute_and_set(key, compute, timeout)
+
+    try:
+        return _compute_and_set(key, compute, timeout)
+    finally:
+        cache.delete(lock_key)
+
+
+def _should_recompute(entry):
+    # 1 - random() is in (0, 1] so log is defined and not positive
+    early = -entry["delta"] * settings.CACHE_EARLY_EXPIRY_BETA
+    early *= math.log(1 - random.random())
+    return time.time() + early >= entry["expires"]
+
+
+def _wait_for_entry(key, lock_key):
+    deadline = time.monotonic() + settings.CACHE_STAMPEDE_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.01)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        # Lock released without value, e.g. response wasn't cacheable
+        if cache.get(lock_key) is None:
+            return None
+    return None
+
+
+def _compute_and_set(key, compute, timeout):
+    start = time.monotonic()
+    value = compute()
+    if value is not None:
+        entry = {
+            "value": value,
+            "expires": time.time() + timeout,
+            "delta": time.monotonic() - start,
+        }
+        # Keep stale entry around to serve it during revalidation
+        cache.set(key, entry, timeout + settings.CACHE_STALE_TIMEOUT)
+    return value
+
+
+class ConditionalGetMixin:
+    """
+    Answer If-None-Match and If-Modified-Since of read-only actions
+    with 304 Not Modified before the response is serialized.
+    Validators are taken from last modification time of the object
+    or MAX(last modification time) and COUNT of the filtered list
+    """
+
+    conditional_actions = ["list", "retrieve"]
+    last_modified_field = "updated_at"
+    # Models whose changes invalidate cached responses and validators
+    cache_models = []
+
+    def get_validators(self, request):
+        """Get (etag, last_modified) pair, cached by model versions if possible"""
+        if not self.cache_models:
+            return self.compute_validators(request)
+
+        prefix = f"validators:{self.basename}:{self.action}"
+        cache_key = get_versioned_cache_key(prefix, self.cache_models, request)
+        return get_or_compute(
+            cache_key,
+            lambda: self.compute_validators(request),
+            settings.RESPONSE_CACHE_TIMEOUT,
+        )
+
+    def compute_validators(self, request):
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+
+        if self.action == "retrieve":
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            lookup = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            try:
+                last_modified = (
+                    queryset.filter(**lookup)
+                    .values_list(self.last_modified_field, flat=True)
+                    .first()
+                )
+            except (TypeError, ValueError, ValidationError):
+                last_modified = None
+            # Let the action respond with 404
+            if last_modified is None:
+                return None
+            count = 1
+        else:
+            stats = queryset.aggregate(
+                last_modified=Max(self.last_modified_field),
+                count=Count("pk"),
+            )
+            last_modified, count = stats["last_modified"], stats["count"]
+
+        version = f"{request.get_full_path()}:{last_modified}:{count}"
+        etag = f'W/"{md5(version.encode("utf-8")).hexdigest()}"'
+        # Deleted rows don't change MAX(updated_at),
+        # so lists are validated only by etag
+        if self.action != "retrieve":
+            return etag, None
+        return etag, int(last_modified.timestamp())
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        if self.action not in self.conditional_actions:
+            return handler(request, *args, **kwargs)
+
+        validators = self.get_validators(request)
+        if validators is None:
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = validators
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response.headers["ETag"] = etag
+            if last_modified is not None:
+                response.headers["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().retrieve, request, *args, **kwargs)
+
+
+class CachedResponseMixin:
+    """
+    Cache response data of read-only actions keyed on the url
+    and versions of models the response is built from
+    """
+
+    cached_actions = ["list", "retrieve"]
+    # Models whose changes invalidate cached responses
+    cache_models = []
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if self.action not in self.cached_actions:
+            return handler(request, *args, **kwargs)
+
+        response = None
+
+        def compute():
+            nonlocal response
+            response = handler(request, *args, **kwargs)
+            return response.data if response.status_code == 200 else None
+
+        prefix = f"response:{self.basename}"
+        cache_key = get_versioned_cache_key(prefix, self.cache_models, request)
+        data = get_or_compute(cache_key, compute, settings.RESPONSE_CACHE_TIMEOUT)
+        # Response computed by this request or taken from cache
+        return response if response is not None else Response(data)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,84 @@
+import hashlib
+import os
+from django.db import models
+from django.db.models.signals import post_delete, post_init, post_save
+from django.db.models.fields.files import ImageFieldFile
+from .models import StoredFile
+
+
+def get_content_hash(content):
+    """SHA-256 hex digest of file read in chunks, not loaded whole"""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def get_content_addressed_name(name, content_hash):
+    """Place file into directory of generated name under its hash"""
+    directory = os.path.dirname(name)
+    extension = os.path.splitext(name)[1].lower()
+    return os.path.join(directory, content_hash[:2], f"{content_hash}{extension}")
+
+
+class ContentAddressedImageFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        name = self.field.generate_filename(self.instance, name)
+        name = get_content_addressed_name(name, get_content_hash(content))
+        # The same content is already stored, reuse the file
+        if not self.storage.exists(name):
+            saved_name = self.storage.save(name, content, self.field.max_length)
+            # Concurrent upload of the same content won, drop own copy
+            if saved_name != name:
+                self.storage.delete(saved_name)
+
+        self.name = name
+        setattr(self.instance, self.field.attname, self.name)
+        self._committed = True
+        if save:
+            self.instance.save()
+
+
+class ContentAddressedImageField(models.ImageField):
+    """
+    Image field storing uploads under SHA-256 of their content in the
+    upload_to directory, so the same image is stored once. References of
+    model instances to files are counted in StoredFile
+    """
+
+    attr_class = ContentAddressedImageFieldFile
+
+    def contribute_to_class(self, cls, name, **kwargs):
+        super().contribute_to_class(cls, name, **kwargs)
+        if not cls._meta.abstract:
+            post_init.connect(self.remember_stored_name, sender=cls)
+            post_save.connect(self.count_references, sender=cls)
+            post_delete.connect(self.release_reference, sender=cls)
+
+    def get_stored_name_attname(self):
+        return f"_{self.attname}_stored_name"
+
+    def remember_stored_name(self, instance, **kwargs):
+        name = instance.__dict__.get(self.attname) if instance.pk else None
+        setattr(instance, self.get_stored_name_attname(), str(name or ""))
+
+    def count_references(self, instance, update_fields=None, **kwargs):
+        if update_fields is not None and self.name not in update_fields:
+            return
+        old_name = getattr(instance, self.get_stored_name_attname(), "")
+        new_name = getattr(instance, self.attname).name or ""
+        if old_name == new_name:
+            return
+
+        if new_name:
+            StoredFile.objects.add_reference(new_name)
+        if old_name:
+            StoredFile.objects.remove_reference(old_name)
+        setattr(instance, self.get_stored_name_attname(), new_name)
+
+    def release_reference(self, instance, **kwargs):
+        name = getattr(instance, self.get_stored_name_attname(), "")
+        if name:
+            StoredFile.objects.remove_reference(name)
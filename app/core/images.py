@@ -0,0 +1,202 @@
+import os
+from io import BytesIO
+from PIL import Image, ImageOps
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from drf_spectacular.utils import extend_schema_field
+from rest_framework import serializers
+from jobs.queue import enqueue
+
+# Pillow format and file extension of derivatives, the first is preferred
+DERIVATIVE_FORMATS = {"webp": ("WEBP", "webp"), "jpeg": ("JPEG", "jpg")}
+
+
+def get_derivative_name(name, size, image_format):
+    """Name of resized copy stored beside the original image"""
+    root = os.path.splitext(name)[0]
+    extension = DERIVATIVE_FORMATS[image_format][1]
+    return f"{root}_{size}.{extension}"
+
+
+def flatten(image):
+    """Convert image to RGB putting transparent one on white background"""
+    if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def generate_derivatives(image):
+    """
+    Save resized and re-encoded copies of the image file in every format
+    of IMAGE_DERIVATIVE_WIDTHS sizes beside it. Images are never upscaled.
+    Return actual widths of the copies by size name
+    """
+    sizes = sorted(settings.IMAGE_DERIVATIVE_WIDTHS.items(), key=lambda size: -size[1])
+    with image.open("rb"), Image.open(image) as original:
+        # Let JPEG decoder downscale while reading instead of resizing later
+        largest = sizes[0][1]
+        original.draft("RGB", (largest, largest * original.height // original.width))
+        resized = flatten(ImageOps.exif_transpose(original))
+
+    widths = {}
+    # Resize from the previous copy, each one is smaller than the last
+    for size, width in sizes:
+        if resized.width > width:
+            height = max(1, round(resized.height * width / resized.width))
+            resized = resized.resize((width, height), reducing_gap=3.0)
+        for image_format, (pillow_format, _) in DERIVATIVE_FORMATS.items():
+            content = BytesIO()
+            resized.save(
+                content,
+                pillow_format,
+                quality=settings.IMAGE_DERIVATIVE_QUALITY,
+                optimize=True,
+            )
+            name = get_derivative_name(image.name, size, image_format)
+            # Overwrite copies left by failed attempt or made for shared image
+            image.storage.delete(name)
+            image.storage.save(name, ContentFile(content.getvalue()))
+        widths[size] = resized.width
+    return widths
+
+
+def get_srcset(image, widths, request=None):
+    """
+    Map of image format to srcset of derivatives described by widths,
+    e.g. {"webp": "<url>_card.webp 300w, ...", "jpeg": "..."}
+    """
+    if not image or not widths:
+        return None
+
+    # Copies of image smaller than some sizes have the same width,
+    # the smallest size of them is used
+    sizes = {}
+    nominal = settings.IMAGE_DERIVATIVE_WIDTHS
+    for size, width in sorted(
+        widths.items(), key=lambda size: (size[1], nominal.get(size[0], 0))
+    ):
+        sizes.setdefault(width, size)
+
+    srcset = {}
+    for image_format in DERIVATIVE_FORMATS:
+        candidates = []
+        for width, size in sizes.items():
+            url = image.storage.url(get_derivative_name(image.name, size, image_format))
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            candidates.append(f"{url} {width}w")
+        srcset[image_format] = ", ".join(candidates)
+    return srcset
+
+
+@extend_schema_field(
+    {
+        "type": "object",
+        "nullable": True,
+        "additionalProperties": {"type": "string"},
+        "example": {"webp": "<url>_thumbnail.webp 150w, ...", "jpeg": "..."},
+    }
+)
+class ImageSrcsetField(serializers.Field):
+    """Read-only srcset map of resized copies of the model image field"""
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs.update(source="*", read_only=True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        image = getattr(instance, self.image_field)
+        widths = getattr(instance, f"{self.image_field}_widths")
+        return get_srcset(image, widths, self.context.get("request"))
+
+
+@extend_schema_field(
+    {"type": "string", "enum": ["pending", "ready", "failed"], "nullable": True}
+)
+class ImageStatusField(serializers.Field):
+    """Read-only state of resized copies of the model image field"""
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs.update(source="*", read_only=True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        if not getattr(instance, self.image_field):
+            return None
+        widths = getattr(instance, f"{self.image_field}_widths")
+        # Widths are cleared to None when copies couldn't be made
+        if widths is None:
+            return "failed"
+        return "ready" if widths else "pending"
+
+
+def process_image_derivatives(model, pk, field, name):
+    """
+    Job making resized copies of the model instance image. Widths are
+    saved only if the image wasn't replaced while copies were made
+    """
+    model = apps.get_model(model)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or getattr(instance, field).name != name:
+        return
+
+    # Content-addressed image may be shared with copies made already
+    widths_field = f"{field}_widths"
+    widths = (
+        model.objects.filter(**{field: name, f"{widths_field}__isnull": False})
+        .exclude(**{widths_field: {}})
+        .values_list(widths_field, flat=True)
+        .first()
+    )
+    if not widths:
+        widths = generate_derivatives(getattr(instance, field))
+
+    instance = model.objects.select_for_update().filter(pk=pk).first()
+    if instance is None or getattr(instance, field).name != name:
+        return
+    setattr(instance, widths_field, widths)
+    instance.save(update_fields=[widths_field, "updated_at"])
+
+
+def mark_image_derivatives_failed(model, pk, field, name):
+    """Set widths to None once the job gave up making copies of the image"""
+    model = apps.get_model(model)
+    widths_field = f"{field}_widths"
+    model.objects.filter(pk=pk, **{field: name, widths_field: {}}).update(
+        **{widths_field: None, "updated_at": timezone.now()}
+    )
+
+
+process_image_derivatives.on_failure = mark_image_derivatives_failed
+
+
+class ImageDerivativesMixin:
+    """
+    Serializer mixin queueing resized copies of the uploaded image,
+    their widths are stored in <image_field>_widths model field once made,
+    None is stored there if they couldn't be made
+    """
+
+    image_field = "image"
+
+    def update(self, instance, validated_data):
+        # Copies of the previous image don't match the new one
+        setattr(instance, f"{self.image_field}_widths", {})
+        instance = super().update(instance, validated_data)
+        image = getattr(instance, self.image_field)
+        if image:
+            enqueue(
+                "core.images.process_image_derivatives",
+                model=instance._meta.label,
+                pk=instance.pk,
+                field=self.image_field,
+                name=image.name,
+            )
+        return instance
@@ -0,0 +1,231 @@
+import os
+from collections import Counter
+from datetime import timedelta
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from core.files import (
+    ContentAddressedImageField,
+    get_content_addressed_name,
+    get_content_hash,
+)
+from core.images import DERIVATIVE_FORMATS, get_derivative_name
+from core.models import StoredFile
+from jobs.queue import enqueue
+
+
+def is_content_addressed(name):
+    """Check file is named after its hash by ContentAddressedImageField"""
+    directory, filename = os.path.split(name)
+    content_hash = os.path.splitext(filename)[0]
+    return len(content_hash) == 64 and os.path.basename(directory) == content_hash[:2]
+
+
+class Command(BaseCommand):
+    """
+    Django command to move uploaded images to content-addressed paths,
+    recount references to them and remove files nothing refers to
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=60 * 60,
+            help="Seconds since the last reference change before file is removed",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        self.dry_run = options["dry_run"]
+        fields = [
+            (model, field)
+            for model in apps.get_models()
+            for field in model._meta.concrete_fields
+            if isinstance(field, ContentAddressedImageField)
+        ]
+
+        moved = sum(self.move_files(model, field) for model, field in fields)
+        recounted = self.reconcile_references(fields)
+
+        directories = {self.get_upload_directory(field) for _, field in fields}
+        storages = {field.storage for _, field in fields}
+        cutoff = timezone.now() - timedelta(seconds=options["min_age"])
+        removed = 0
+        for storage in storages:
+            self.track_orphans(storage, directories)
+            removed += self.collect_garbage(storage, cutoff)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Moved {moved} files, recounted {recounted} references, "
+                f"removed {removed} unreferenced files!"
+            )
+        )
+
+    # Rename files to their hashes, the old ones are removed as unreferenced
+    def move_files(self, model, field):
+        field_names = {model_field.name for model_field in model._meta.fields}
+        widths_field = f"{field.attname}_widths"
+        has_widths = widths_field in field_names
+        instances = model.objects.exclude(**{field.attname: ""}).exclude(
+            **{f"{field.attname}__isnull": True}
+        )
+
+        moved = 0
+        for instance in instances.iterator():
+            image = getattr(instance, field.attname)
+            if is_content_addressed(image.name) or not image.storage.exists(image.name):
+                continue
+            with image.storage.open(image.name) as content:
+                name = get_content_addressed_name(image.name, get_content_hash(content))
+                self.stdout.write(f"{image.name} -> {name}")
+                if self.dry_run:
+                    moved += 1
+                    continue
+                if not image.storage.exists(name):
+                    image.storage.save(name, content)
+
+            setattr(instance, field.attname, name)
+            update_fields = [field.attname]
+            if "updated_at" in field_names:
+                update_fields.append("updated_at")
+            if has_widths:
+                setattr(instance, widths_field, {})
+                update_fields.append(widths_field)
+            instance.save(update_fields=update_fields)
+            if has_widths:
+                enqueue(
+                    "core.images.process_image_derivatives",
+                    model=model._meta.label,
+                    pk=instance.pk,
+                    field=field.attname,
+                    name=name,
+                )
+            moved += 1
+        return moved
+
+    def count_references(self, fields, name=None):
+        references = Counter()
+        for model, field in fields:
+            rows = model.objects.exclude(**{field.attname: ""}).exclude(
+                **{f"{field.attname}__isnull": True}
+            )
+            if name is not None:
+                rows = rows.filter(**{field.attname: name})
+            rows = rows.values_list(field.attname).annotate(count=Count("pk"))
+            for file_name, count in rows.order_by():
+                references[file_name] += count
+        return references
+
+    # Fields count references live, only rows which drifted from the scan
+    # are recounted one by one under lock instead of rebuilding the table
+    def reconcile_references(self, fields):
+        references = self.count_references(fields)
+        stored = dict(StoredFile.objects.values_list("name", "ref_count"))
+        names = {
+            name
+            for name in set(references) | set(stored)
+            if references.get(name, 0) != stored.get(name)
+        }
+
+        recounted = 0
+        for name in sorted(names):
+            if self.dry_run:
+                count = references.get(name, 0)
+                self.stdout.write(f"Recount {name}: {stored.get(name)} -> {count}")
+                recounted += 1
+                continue
+            with transaction.atomic():
+                StoredFile.objects.bulk_create(
+                    [StoredFile(name=name)], ignore_conflicts=True
+                )
+                stored_file = StoredFile.objects.select_for_update().get(name=name)
+                count = self.count_references(fields, name)[name]
+                if stored_file.ref_count != count:
+                    stored_file.ref_count = count
+                    stored_file.save(update_fields=["ref_count", "updated_at"])
+                    recounted += 1
+        return recounted
+
+    # Files without row, e.g. left by moves or failed uploads, get one with
+    # no references dated by modification time to be collected as the rest
+    def track_orphans(self, storage, directories):
+        files = {
+            name
+            for directory in directories
+            for name in self.list_files(storage, directory)
+        }
+        tracked = set(StoredFile.objects.values_list("name", flat=True))
+        originals = files | tracked
+        derivatives = {
+            derivative
+            for name in originals
+            for derivative in self.get_derivative_names(name)
+        }
+
+        for name in sorted(files - tracked - derivatives):
+            modified_at = storage.get_modified_time(name)
+            if self.dry_run:
+                self.stdout.write(f"Untracked {name}")
+                continue
+            StoredFile.objects.bulk_create(
+                [StoredFile(name=name)], ignore_conflicts=True
+            )
+            # Reference may be added meanwhile, it keeps the current date
+            StoredFile.objects.filter(name=name, ref_count=0).update(
+                updated_at=modified_at
+            )
+
+    # Row is locked and checked again so a reference added since the query
+    # waits for the removal, recently referenced files are kept by min age
+    def collect_garbage(self, storage, cutoff):
+        candidates = StoredFile.objects.filter(ref_count=0, updated_at__lte=cutoff)
+        removed = 0
+        for name in list(candidates.values_list("name", flat=True)):
+            with transaction.atomic():
+                stored_file = (
+                    StoredFile.objects.select_for_update()
+                    .filter(name=name, ref_count=0, updated_at__lte=cutoff)
+                    .first()
+                )
+                if stored_file is None:
+                    continue
+                removed += self.remove_files(storage, name)
+                if not self.dry_run:
+                    stored_file.delete()
+        return removed
+
+    def get_derivative_names(self, name):
+        return [
+            get_derivative_name(name, size, image_format)
+            for size in settings.IMAGE_DERIVATIVE_WIDTHS
+            for image_format in DERIVATIVE_FORMATS
+        ]
+
+    def get_upload_directory(self, field):
+        return os.path.dirname(field.generate_filename(None, "file"))
+
+    def list_files(self, storage, directory):
+        if not storage.exists(directory):
+            return
+        directories, files = storage.listdir(directory)
+        for filename in files:
+            yield os.path.join(directory, filename)
+        for subdirectory in directories:
+            yield from self.list_files(storage, os.path.join(directory, subdirectory))
+
+    # Resized copies go away together with the original
+    def remove_files(self, storage, name):
+        removed = 0
+        for file_name in [name] + self.get_derivative_names(name):
+            if not storage.exists(file_name):
+                continue
+            self.stdout.write(f"Removing {file_name}")
+            if not self.dry_run:
+                storage.delete(file_name)
+            removed += 1
+        return removed
@@ -0,0 +1,38 @@
+from django.db import connections, models
+
+
+class StoredFileQuerySet(models.QuerySet):
+    def add_reference(self, name):
+        """Count one more reference to the file, creating its row if missing"""
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        sql = f"""
+            INSERT INTO {table} (name, ref_count, updated_at)
+            VALUES (%s, 1, now())
+            ON CONFLICT (name)
+            DO UPDATE SET ref_count = {table}.ref_count + 1, updated_at = now()
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [name])
+
+    def remove_reference(self, name):
+        """Count one reference to the file less, never below zero"""
+        self.filter(name=name, ref_count__gt=0).update(
+            ref_count=models.F("ref_count") - 1, updated_at=models.functions.Now()
+        )
+
+
+class StoredFile(models.Model):
+    """
+    Number of model fields referencing content-addressed file, the ones
+    without references are removed by dedupe_media command
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = StoredFileQuerySet.as_manager()
+
+    def __str__(self):
+        return self.name
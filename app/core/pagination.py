@@ -0,0 +1,319 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+from decimal import Decimal
+from hashlib import md5
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination,
+    LimitOffsetPagination,
+    _positive_int,
+)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_cursor_value(value):
+    """Keep full precision of decimals and datetimes in the cursor"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Can't encode {type(value).__name__} in cursor")
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate by the ordering values of the last seen row instead of offset,
+    so every page costs the same as the first one and no COUNT(*) is needed
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = None
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.ordering_fields = self.get_ordering_fields(queryset)
+        values, reverse = self.decode_cursor(request)
+
+        if values is not None:
+            queryset = queryset.filter(self.get_keyset_filter(values, reverse))
+        ordering = [
+            f"-{field}" if descending != reverse else field
+            for field, descending in self.ordering
+        ]
+        results = list(queryset.order_by(*ordering)[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, queryset):
+        """
+        Get (field, descending) pairs from the already ordered queryset
+        and append "id" as a tiebreaker to make the ordering unique
+        """
+        fields = queryset.query.order_by or queryset.model._meta.ordering or ["id"]
+        ordering = [
+            (field.lstrip("-"), field.startswith("-"))
+            for field in fields
+            if isinstance(field, str)
+        ]
+        if not any(field in ("id", "pk") for field, _ in ordering):
+            # Follow the direction of the last field so a single
+            # (field, id) index serves both directions
+            descending = ordering[-1][1] if ordering else False
+            ordering.append(("id", descending))
+        return ordering
+
+    def get_ordering_fields(self, queryset):
+        """Model or annotation field of each ordering name to parse the cursor"""
+        # Resolving related names adds joins, keep them out of the queryset
+        query = queryset.query.clone()
+        return [query.resolve_ref(field).output_field for field, _ in self.ordering]
+
+    def get_keyset_filter(self, values, reverse):
+        """
+        Build (f1 > v1) OR (f1 = v1 AND f2 > v2) OR ... condition.
+        The extra inclusive bound on the first field lets postgres
+        start the index scan right at the cursor position
+        """
+        (first_field, first_descending), first_value = self.ordering[0], values[0]
+        lookup = "lte" if first_descending != reverse else "gte"
+        bound = Q(**{f"{first_field}__{lookup}": first_value})
+
+        condition = Q()
+        equal = {}
+        for (field, descending), value in zip(self.ordering, values):
+            lookup = "lt" if descending != reverse else "gt"
+            condition |= Q(**equal, **{f"{field}__{lookup}": value})
+            equal[field] = value
+        return bound & condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            values, reverse = cursor["v"], bool(cursor.get("r"))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Values of other types than the fields would fail in the database
+        try:
+            values = [
+                field.to_python(value)
+                for field, value in zip(self.ordering_fields, values)
+            ]
+        except (ValidationError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def encode_cursor(self, obj, reverse):
+        values = [getattr(obj, field) for field, _ in self.ordering]
+        cursor = {"v": values}
+        if reverse:
+            cursor["r"] = 1
+        data = json.dumps(cursor, default=_encode_cursor_value, separators=(",", ":"))
+        encoded = urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Back to the first page
+            return replace_query_param(self.base_url, self.cursor_query_param, "")
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": (
+                    "Keyset pagination cursor. Pass an empty value to get "
+                    "the first page, then follow `next` and `previous` links"
+                ),
+                "schema": {"type": "string"},
+            },
+        ]
+
+
+class EstimatedCountPagination(LimitOffsetPagination):
+    """
+    Limit offset pagination which takes the row count from postgres planner
+    estimate when it's above PAGINATION_ESTIMATE_THRESHOLD and caches
+    exact counts of smaller result sets per filter combination
+    """
+
+    count_cache_prefix = "pagination-count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Request is needed to build count cache key
+        self.request = request
+        self.count_estimated = False
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset):
+        cache_key = self.get_count_cache_key(queryset)
+        count = cache.get(cache_key)
+        if count is not None:
+            return count
+
+        estimate = self.estimate_count(queryset)
+        if estimate is not None and estimate >= settings.PAGINATION_ESTIMATE_THRESHOLD:
+            self.count_estimated = True
+            return estimate
+
+        count = super().get_count(queryset)
+        cache.set(cache_key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        return count
+
+    def get_count_cache_key(self, queryset):
+        """Build key from path and query params which filter the queryset"""
+        ignored_params = {
+            self.limit_query_param,
+            self.offset_query_param,
+            api_settings.ORDERING_PARAM,
+            api_settings.URL_FORMAT_OVERRIDE,
+        }
+        params = sorted(
+            (key, value)
+            for key, values in self.request.query_params.lists()
+            if key not in ignored_params
+            for value in values
+        )
+        filters_hash = md5(urlencode(params).encode("utf-8")).hexdigest()
+        model = queryset.model._meta.label_lower
+        return f"{self.count_cache_prefix}:{model}:{self.request.path}:{filters_hash}"
+
+    def estimate_count(self, queryset):
+        """
+        Get row estimate from pg_class for unfiltered queryset
+        or from EXPLAIN otherwise without executing the query
+        """
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+
+        try:
+            sql, params = queryset.order_by().query.sql_with_params()
+        except EmptyResultSet:
+            return None
+
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+                # Table which has never been analyzed has -1 reltuples
+                if row and row[0] >= 0:
+                    return row[0]
+
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]["Plan"]["Plan Rows"]
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data["count_estimated"] = self.count_estimated
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_estimated"] = {
+            "type": "boolean",
+            "example": False,
+        }
+        return response_schema
+
+
+class KeysetOrLimitOffsetPagination(EstimatedCountPagination):
+    """
+    Limit offset pagination by default, keyset pagination when
+    request has "cursor" query param so existing clients keep working
+    """
+
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        return parameters + self.keyset_class().get_schema_operation_parameters(view)
@@ -0,0 +1,232 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.handlers.wsgi import get_path_info
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+FILE_CHUNK_SIZE = 64 * 1024
+
+# Names changing with content: "<name>.<md5[:12]>.<ext>" of manifest static
+# storage and "<sha256>[_<size>].<ext>" of content-addressed uploads
+STATIC_IMMUTABLE_NAME = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+MEDIA_IMMUTABLE_NAME = re.compile(r"/[0-9a-f]{64}(_\w+)?\.[^./]+$")
+
+# Precompressed variant suffixes in order of preference
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_accept_encoding(header):
+    """Set of content codings the client accepts"""
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        quality = params.strip().partition("=")[2].strip()
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def parse_range(header, size):
+    """
+    First and last byte of single "bytes" range, None when the whole file
+    should be sent. Multiple and malformed ranges are ignored
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start, _, end = spec.strip().partition("-")
+    try:
+        if not start:
+            suffix = int(end)
+            if suffix <= 0:
+                raise RangeNotSatisfiable
+            return max(0, size - suffix), size - 1
+        start, end = int(start), int(end) if end else None
+    except ValueError:
+        return None
+
+    if end is not None and start > end:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+def iter_file(file, length):
+    """Read only length bytes of the file in chunks, then close it"""
+    try:
+        while length > 0:
+            chunk = file.read(min(FILE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+class FileServer:
+    """
+    WSGI middleware serving files of STATIC_ROOT and MEDIA_ROOT before
+    the request reaches Django. Hashed names are cached by clients forever,
+    precompressed variants are preferred and single ranges are supported.
+    Whole files are sent by the server's wsgi.file_wrapper (sendfile with
+    gunicorn), or handed off to nginx by X-Accel-Redirect when
+    FILES_ACCEL_REDIRECT_PREFIX is set
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        path = get_path_info(environ)
+        file_path = self.find_file(path)
+        if file_path is None:
+            return self.application(environ, start_response)
+
+        if environ["REQUEST_METHOD"] not in ("GET", "HEAD"):
+            start_response(
+                "405 Method Not Allowed",
+                [("Allow", "GET, HEAD"), ("Content-Length", "0")],
+            )
+            return []
+        return self.serve(environ, start_response, path, file_path)
+
+    def get_roots(self):
+        roots = [
+            (settings.STATIC_URL, settings.STATIC_ROOT),
+            (settings.MEDIA_URL, settings.MEDIA_ROOT),
+        ]
+        return [(url, root) for url, root in roots if url and root]
+
+    def find_file(self, path):
+        """Absolute path of the file the URL path refers to if it exists"""
+        for url, root in self.get_roots():
+            if not path.startswith(url):
+                continue
+            name = path[len(url) :]
+            # Hidden files such as leftovers of editors are never served
+            if any(part.startswith(".") for part in name.split("/")):
+                return None
+            try:
+                file_path = safe_join(root, name)
+            except SuspiciousFileOperation:
+                return None
+            return file_path if os.path.isfile(file_path) else None
+        return None
+
+    def serve(self, environ, start_response, path, file_path):
+        headers = {
+            "Content-Type": mimetypes.guess_type(file_path)[0]
+            or "application/octet-stream",
+            "Cache-Control": self.get_cache_control(path),
+            "X-Content-Type-Options": "nosniff",
+        }
+        if settings.FILES_ACCEL_REDIRECT_PREFIX:
+            # Web server sends the file, handles ranges and compression
+            prefix = settings.FILES_ACCEL_REDIRECT_PREFIX.rstrip("/")
+            headers["X-Accel-Redirect"] = prefix + quote(path)
+            headers["Content-Length"] = "0"
+            start_response("200 OK", list(headers.items()))
+            return []
+
+        range_header = environ.get("HTTP_RANGE")
+        variants = [
+            (encoding, file_path + suffix)
+            for encoding, suffix in ENCODINGS
+            if os.path.isfile(file_path + suffix)
+        ]
+        if variants:
+            headers["Vary"] = "Accept-Encoding"
+        # Ranges refer to the identity encoding
+        if not range_header:
+            accepted = parse_accept_encoding(environ.get("HTTP_ACCEPT_ENCODING", ""))
+            for encoding, variant_path in variants:
+                if encoding in accepted:
+                    headers["Content-Encoding"] = encoding
+                    file_path = variant_path
+                    break
+
+        stat = os.stat(file_path)
+        size = stat.st_size
+        etag = f'"{int(stat.st_mtime):x}-{size:x}"'
+        headers["ETag"] = etag
+        headers["Last-Modified"] = http_date(stat.st_mtime)
+        headers["Accept-Ranges"] = "bytes"
+        if self.is_not_modified(environ, etag, stat.st_mtime):
+            start_response("304 Not Modified", list(headers.items()))
+            return []
+
+        status, start, length = "200 OK", 0, size
+        if range_header and self.is_range_fresh(environ, etag, stat.st_mtime):
+            try:
+                byte_range = parse_range(range_header, size)
+            except RangeNotSatisfiable:
+                headers["Content-Range"] = f"bytes */{size}"
+                headers["Content-Length"] = "0"
+                start_response("416 Range Not Satisfiable", list(headers.items()))
+                return []
+            if byte_range is not None:
+                start, end = byte_range
+                status, length = "206 Partial Content", end - start + 1
+                headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+        headers["Content-Length"] = str(length)
+        start_response(status, list(headers.items()))
+        if environ["REQUEST_METHOD"] == "HEAD":
+            return []
+
+        file = open(file_path, "rb")
+        file_wrapper = environ.get("wsgi.file_wrapper")
+        if length == size and file_wrapper is not None:
+            return file_wrapper(file, FILE_CHUNK_SIZE)
+        file.seek(start)
+        return iter_file(file, length)
+
+    def get_cache_control(self, path):
+        if self.is_immutable(path):
+            max_age = settings.FILES_IMMUTABLE_MAX_AGE
+            return f"public, max-age={max_age}, immutable"
+        return f"public, max-age={settings.FILES_MAX_AGE}"
+
+    # Each root has its own hashed names, a legacy upload may look like
+    # a hashed static file
+    def is_immutable(self, path):
+        patterns = [
+            (settings.STATIC_URL, STATIC_IMMUTABLE_NAME),
+            (settings.MEDIA_URL, MEDIA_IMMUTABLE_NAME),
+        ]
+        return any(
+            url and path.startswith(url) and pattern.search(path)
+            for url, pattern in patterns
+        )
+
+    def is_not_modified(self, environ, etag, mtime):
+        if_none_match = environ.get("HTTP_IF_NONE_MATCH")
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            # Weak comparison, the same file may be served with W/ by proxies
+            return "*" in etags or etag in [tag.removeprefix("W/") for tag in etags]
+        modified_since = parse_http_date_safe(environ.get("HTTP_IF_MODIFIED_SINCE", ""))
+        return modified_since is not None and int(mtime) <= modified_since
+
+    # Range of changed file would be mixed with the old copy of the client
+    def is_range_fresh(self, environ, etag, mtime):
+        if_range = environ.get("HTTP_IF_RANGE")
+        if not if_range:
+            return True
+        if if_range.startswith('"'):
+            return if_range == etag
+        return parse_http_date_safe(if_range) == int(mtime)
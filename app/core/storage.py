@@ -0,0 +1,55 @@
+import gzip
+import os
+import brotli
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+
+def compress_gzip(data):
+    # Fixed mtime keeps the output the same for the same content
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def compress_brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+# File suffix and function of precompression encodings
+COMPRESSORS = {".gz": compress_gzip, ".br": compress_brotli}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage which also writes gzip and brotli copies of hashed
+    text files beside them on collectstatic.
+    The copies are kept only if they are meaningfully smaller
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        for name in self.hashed_files.values():
+            if self.is_compressible(name):
+                self.compress(name)
+
+    def is_compressible(self, name):
+        extension = os.path.splitext(name)[1].lower()
+        return (
+            extension in settings.STATIC_COMPRESS_EXTENSIONS
+            and self.size(name) >= settings.STATIC_COMPRESS_MIN_SIZE
+        )
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, "rb") as file:
+            data = file.read()
+
+        for suffix, compress in COMPRESSORS.items():
+            compressed = compress(data)
+            if len(compressed) > len(data) * 0.95:
+                continue
+            # Written directly, storage would rename existing file on save
+            with open(path + suffix, "wb") as file:
+                file.write(compressed)
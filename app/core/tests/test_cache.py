@@ -0,0 +1,87 @@
+import threading
+import time
+from unittest.mock import patch
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from core.cache import LRUCache, get_or_compute
+
+
+class GetOrComputeTests(SimpleTestCase):
+    """Test single-flight cache against locmem backend"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        """Test concurrent requests of missing key run computation once"""
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return "value"
+
+        def request():
+            results.append(get_or_compute("key", compute, 60))
+
+        threads = [threading.Thread(target=request) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 10)
+
+    def test_stale_value_served_while_recomputing(self):
+        """Test expired value is returned while other worker holds lock"""
+        get_or_compute("key", lambda: "old", 60)
+        cache.add("key:lock", 1)
+
+        with patch("time.time", return_value=time.time() + 61):
+            value = get_or_compute("key", lambda: "new", 60)
+
+        self.assertEqual(value, "old")
+
+    def test_expired_value_recomputed(self):
+        """Test expired value is recomputed by the lock holder"""
+        get_or_compute("key", lambda: "old", 60)
+
+        with patch("time.time", return_value=time.time() + 61):
+            value = get_or_compute("key", lambda: "new", 60)
+
+        self.assertEqual(value, "new")
+        self.assertIsNone(cache.get("key:lock"))
+
+    @override_settings(CACHE_EARLY_EXPIRY_BETA=1.0)
+    def test_early_expiry(self):
+        """Test value is recomputed early when random draw is low enough"""
+        cache.set("key", {"value": "old", "expires": time.time() + 1, "delta": 10})
+
+        with patch("random.random", return_value=0.0):
+            self.assertEqual(get_or_compute("key", lambda: "new", 60), "old")
+        with patch("random.random", return_value=0.99):
+            self.assertEqual(get_or_compute("key", lambda: "new", 60), "new")
+
+    def test_none_not_cached(self):
+        """Test None result is returned but not stored"""
+        self.assertIsNone(get_or_compute("key", lambda: None, 60))
+        self.assertIsNone(cache.get("key"))
+        self.assertIsNone(cache.get("key:lock"))
+
+
+class LRUCacheTests(SimpleTestCase):
+    """Test in-process LRU cache"""
+
+    def test_least_recently_used_dropped(self):
+        """Test the value not used for the longest time is dropped when full"""
+        lru = LRUCache(max_size=2)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+
+        self.assertEqual(lru.get("a"), 1)
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual(lru.get("c"), 3)
@@ -1,8 +1,20 @@
+import hashlib
+import os
+import tempfile
+from collections import Counter
+from io import StringIO
 from unittest.mock import patch
 from psycopg2 import OperationalError as Psycopg2OpError
+from django.core.files.storage import default_storage
+from django.core.files.base import ContentFile
 from django.core.management import call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from core.models import StoredFile
+from jobs.models import Job
+from product.models import Product
+from product.tests.test_models import create_category, create_product
 
 
 @patch("core.management.commands.wait_for_db.Command.check")
@@ -18,3 +30,92 @@ class CommandTests(SimpleTestCase):
         call_command("wait_for_db")
         self.assertEqual(mock_check.call_count, 6)
         mock_check.assert_called_with(databases=["default"])
+
+
+class DedupeMediaTests(TestCase):
+    """Test dedupe_media command"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        override = override_settings(MEDIA_ROOT=media_root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_files_moved_and_orphans_removed(self):
+        """Test duplicates share content-addressed file and orphans go away"""
+        category = create_category()
+        p1 = create_product(category)
+        p2 = create_product(category)
+        for product, name in [
+            (p1, "uploads/product/a.jpg"),
+            (p2, "uploads/product/b.jpg"),
+        ]:
+            default_storage.save(name, ContentFile(b"same"))
+            Product.objects.filter(pk=product.pk).update(image=name)
+        default_storage.save("uploads/product/a_card.jpg", ContentFile(b"copy"))
+        default_storage.save("uploads/product/deleted.jpg", ContentFile(b"orphan"))
+        StoredFile.objects.create(name="uploads/product/deleted.jpg", ref_count=1)
+
+        out = StringIO()
+        call_command("dedupe_media", min_age=0, stdout=out)
+
+        self.assertIn(
+            "Moved 2 files, recounted 1 references, removed 4 unreferenced files!",
+            out.getvalue(),
+        )
+        content_hash = hashlib.sha256(b"same").hexdigest()
+        name = f"uploads/product/{content_hash[:2]}/{content_hash}.jpg"
+        p1.refresh_from_db()
+        p2.refresh_from_db()
+        self.assertEqual(p1.image.name, name)
+        self.assertEqual(p2.image.name, name)
+        self.assertEqual(p1.image_widths, {})
+        self.assertEqual(Job.objects.count(), 2)
+        _, files = default_storage.listdir("uploads/product")
+        self.assertEqual(files, [])
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(
+            list(StoredFile.objects.values_list("name", "ref_count")), [(name, 2)]
+        )
+
+    def test_recent_files_kept(self):
+        """Test unreferenced files newer than min age aren't removed"""
+        default_storage.save("uploads/product/uploading.jpg", ContentFile(b"new"))
+        call_command("dedupe_media", stdout=StringIO())
+
+        self.assertTrue(default_storage.exists("uploads/product/uploading.jpg"))
+
+    def test_reference_missed_by_scan_kept(self):
+        """Test file referenced after the scan isn't removed"""
+        product = create_product(create_category())
+        product.image.save("old.jpg", ContentFile(b"old"))
+        # Reused file keeps its old modification time
+        past = timezone.now().timestamp() - 2 * 60 * 60
+        os.utime(product.image.path, (past, past))
+
+        with patch(
+            "core.management.commands.dedupe_media.Command.count_references",
+            side_effect=[Counter(), Counter({product.image.name: 1})],
+        ):
+            call_command("dedupe_media", min_age=0, stdout=StringIO())
+
+        self.assertTrue(default_storage.exists(product.image.name))
+        self.assertEqual(StoredFile.objects.get(name=product.image.name).ref_count, 1)
+
+    def test_recently_released_file_kept(self):
+        """Test file whose reference was removed recently waits for min age"""
+        product = create_product(create_category())
+        product.image.save("old.jpg", ContentFile(b"old"))
+        name = product.image.name
+        past = timezone.now().timestamp() - 2 * 60 * 60
+        os.utime(product.image.path, (past, past))
+        product.delete()
+
+        call_command("dedupe_media", stdout=StringIO())
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(StoredFile.objects.get(name=name).ref_count, 0)
+
+        call_command("dedupe_media", min_age=0, stdout=StringIO())
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
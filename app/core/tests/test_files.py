@@ -0,0 +1,61 @@
+import hashlib
+import os
+import tempfile
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from core.models import StoredFile
+from product.models import Product
+from product.tests.test_models import create_category, create_product
+
+
+class ContentAddressedImageFieldTests(TestCase):
+    """Test images are stored once under hash of their content"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        override = override_settings(MEDIA_ROOT=media_root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.category = create_category()
+
+    def save_image(self, product, content):
+        product.image.save("photo.JPG", ContentFile(content))
+
+    def get_ref_count(self, name):
+        return StoredFile.objects.get(name=name).ref_count
+
+    def test_same_content_stored_once(self):
+        """Test uploads of the same content share one file"""
+        p1 = create_product(self.category)
+        p2 = create_product(self.category)
+        self.save_image(p1, b"image content")
+        self.save_image(p2, b"image content")
+
+        content_hash = hashlib.sha256(b"image content").hexdigest()
+        name = f"uploads/product/{content_hash[:2]}/{content_hash}.jpg"
+        self.assertEqual(p1.image.name, name)
+        self.assertEqual(p2.image.name, name)
+        directory = os.path.dirname(p1.image.path)
+        self.assertEqual(os.listdir(directory), [f"{content_hash}.jpg"])
+        self.assertEqual(self.get_ref_count(name), 2)
+
+    def test_references_counted(self):
+        """Test replacing image and deleting instance release references"""
+        p1 = create_product(self.category)
+        p2 = create_product(self.category)
+        self.save_image(p1, b"first")
+        self.save_image(p2, b"first")
+        first_name = p1.image.name
+
+        self.save_image(p1, b"second")
+        self.assertEqual(self.get_ref_count(first_name), 1)
+        self.assertEqual(self.get_ref_count(p1.image.name), 1)
+
+        # Instance loaded from database knows its stored image
+        Product.objects.get(pk=p2.pk).delete()
+        self.assertEqual(self.get_ref_count(first_name), 0)
+        # Saving other fields doesn't count reference again
+        p1.name = "new name"
+        p1.save()
+        self.assertEqual(self.get_ref_count(p1.image.name), 1)
@@ -0,0 +1,67 @@
+import os
+import tempfile
+from PIL import Image
+from django.core.files.storage import FileSystemStorage
+from django.db.models import ImageField
+from django.db.models.fields.files import ImageFieldFile
+from django.test import SimpleTestCase, override_settings
+from core.images import generate_derivatives, get_srcset
+
+
+@override_settings(IMAGE_DERIVATIVE_WIDTHS={"thumbnail": 150, "card": 300})
+class ImageDerivativesTests(SimpleTestCase):
+    """Test resized image copies"""
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        storage = FileSystemStorage(self.media_root.name, "/media/")
+        self.field = ImageField(storage=storage)
+
+    def create_image(self, size, mode="RGB"):
+        name = "uploads/photo.png"
+        path = os.path.join(self.media_root.name, name)
+        os.makedirs(os.path.dirname(path))
+        Image.new(mode, size).save(path)
+        return ImageFieldFile(None, self.field, name)
+
+    def test_derivatives_saved_beside_original(self):
+        """Test WebP and JPEG copies are saved resized to each width"""
+        image = self.create_image((1000, 500), mode="RGBA")
+        widths = generate_derivatives(image)
+
+        self.assertEqual(widths, {"thumbnail": 150, "card": 300})
+        for name, image_format, size in [
+            ("photo_card.webp", "WEBP", (300, 150)),
+            ("photo_card.jpg", "JPEG", (300, 150)),
+            ("photo_thumbnail.webp", "WEBP", (150, 75)),
+            ("photo_thumbnail.jpg", "JPEG", (150, 75)),
+        ]:
+            path = os.path.join(self.media_root.name, "uploads", name)
+            with Image.open(path) as derivative:
+                self.assertEqual(derivative.format, image_format)
+                self.assertEqual(derivative.size, size)
+
+    def test_small_image_not_upscaled(self):
+        """Test copies aren't wider than original and srcset has no repeats"""
+        image = self.create_image((200, 100))
+        widths = generate_derivatives(image)
+
+        self.assertEqual(widths, {"thumbnail": 150, "card": 200})
+        srcset = get_srcset(image, widths)
+        self.assertEqual(
+            srcset["webp"],
+            "/media/uploads/photo_thumbnail.webp 150w, "
+            "/media/uploads/photo_card.webp 200w",
+        )
+        self.assertEqual(
+            srcset["jpeg"],
+            "/media/uploads/photo_thumbnail.jpg 150w, "
+            "/media/uploads/photo_card.jpg 200w",
+        )
+
+    def test_no_srcset_without_image(self):
+        """Test srcset is None when image is missing"""
+        image = ImageFieldFile(None, self.field, None)
+
+        self.assertIsNone(get_srcset(image, {}))
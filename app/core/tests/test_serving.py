@@ -0,0 +1,247 @@
+import gzip
+import os
+import re
+import tempfile
+from wsgiref.util import FileWrapper, setup_testing_defaults
+import brotli
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.utils.http import http_date
+from core.serving import FileServer, parse_range, RangeNotSatisfiable
+
+CONTENT_HASH = "ab" * 32
+IMAGE_NAME = f"uploads/product/ab/{CONTENT_HASH}.jpg"
+IMAGE_URL = f"/static/media/{IMAGE_NAME}"
+IMAGE_CONTENT = bytes(range(256)) * 4
+
+
+def app(environ, start_response):
+    """Stand-in for Django application"""
+    start_response("404 Not Found", [])
+    return [b"django"]
+
+
+class FileServerTests(SimpleTestCase):
+    """Test files are served before requests reach Django"""
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.static_root = os.path.join(root.name, "static")
+        self.media_root = os.path.join(root.name, "media")
+        override = override_settings(
+            STATIC_ROOT=self.static_root,
+            MEDIA_ROOT=self.media_root,
+            FILES_ACCEL_REDIRECT_PREFIX="",
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.write_file(self.media_root, IMAGE_NAME, IMAGE_CONTENT)
+        self.server = FileServer(app)
+
+    def write_file(self, root, name, content):
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(content)
+        return path
+
+    def request(self, path, method="GET", **headers):
+        environ = {"PATH_INFO": path, "REQUEST_METHOD": method}
+        environ.update(headers)
+        setup_testing_defaults(environ)
+        environ["wsgi.file_wrapper"] = FileWrapper
+        response = {}
+
+        def start_response(status, headers):
+            response["status"] = status
+            response["headers"] = dict(headers)
+
+        result = self.server(environ, start_response)
+        response["body"] = b"".join(result)
+        if hasattr(result, "close"):
+            result.close()
+        return response
+
+    def test_hashed_media_cached_forever(self):
+        """Test content-addressed image is served with immutable cache"""
+        res = self.request(IMAGE_URL)
+
+        self.assertEqual(res["status"], "200 OK")
+        self.assertEqual(res["body"], IMAGE_CONTENT)
+        self.assertEqual(res["headers"]["Content-Type"], "image/jpeg")
+        self.assertEqual(res["headers"]["Content-Length"], str(len(IMAGE_CONTENT)))
+        self.assertIn("immutable", res["headers"]["Cache-Control"])
+        self.assertEqual(res["headers"]["Accept-Ranges"], "bytes")
+
+    def test_derivative_and_static_hashed_names_cached_forever(self):
+        """Test resized copies and manifest static names are immutable"""
+        self.write_file(self.media_root, IMAGE_NAME[:-4] + "_card.webp", b"webp")
+        self.write_file(self.static_root, "admin/base.0123456789ab.css", b"css")
+
+        res = self.request(IMAGE_URL[:-4] + "_card.webp")
+        self.assertIn("immutable", res["headers"]["Cache-Control"])
+        res = self.request("/static/static/admin/base.0123456789ab.css")
+        self.assertIn("immutable", res["headers"]["Cache-Control"])
+
+    def test_unhashed_name_revalidated(self):
+        """Test file which may change under its name is cached shortly"""
+        self.write_file(self.static_root, "robots.txt", b"robots")
+        res = self.request("/static/static/robots.txt")
+
+        self.assertEqual(res["body"], b"robots")
+        self.assertEqual(res["headers"]["Cache-Control"], "public, max-age=60")
+
+    def test_hashed_names_immutable_only_in_their_root(self):
+        """Test legacy upload named like hashed static file is revalidated"""
+        self.write_file(self.media_root, "photo.0123456789ab.jpg", b"photo")
+        self.write_file(self.static_root, f"{CONTENT_HASH}.css", b"css")
+
+        res = self.request("/static/media/photo.0123456789ab.jpg")
+        self.assertEqual(res["headers"]["Cache-Control"], "public, max-age=60")
+        res = self.request(f"/static/static/{CONTENT_HASH}.css")
+        self.assertEqual(res["headers"]["Cache-Control"], "public, max-age=60")
+
+    def test_other_requests_passed_to_django(self):
+        """Test missing, hidden and outside files are left to Django"""
+        self.write_file(self.media_root, ".secret", b"secret")
+        paths = [
+            "/api/product/",
+            "/static/media/missing.jpg",
+            "/static/media/.secret",
+            "/static/media/../media/.secret",
+            "/static/media/uploads",
+        ]
+        for path in paths:
+            res = self.request(path)
+            self.assertEqual(res["body"], b"django", path)
+
+    def test_method_not_allowed(self):
+        """Test files can only be read"""
+        res = self.request(IMAGE_URL, method="POST")
+
+        self.assertEqual(res["status"], "405 Method Not Allowed")
+        self.assertEqual(res["headers"]["Allow"], "GET, HEAD")
+
+    def test_head_without_body(self):
+        """Test HEAD request gets headers only"""
+        res = self.request(IMAGE_URL, method="HEAD")
+
+        self.assertEqual(res["status"], "200 OK")
+        self.assertEqual(res["headers"]["Content-Length"], str(len(IMAGE_CONTENT)))
+        self.assertEqual(res["body"], b"")
+
+    def test_not_modified(self):
+        """Test conditional requests of unchanged file"""
+        res = self.request(IMAGE_URL)
+        etag = res["headers"]["ETag"]
+        last_modified = res["headers"]["Last-Modified"]
+
+        res = self.request(IMAGE_URL, HTTP_IF_NONE_MATCH=f"W/{etag}")
+        self.assertEqual(res["status"], "304 Not Modified")
+        self.assertEqual(res["body"], b"")
+        res = self.request(IMAGE_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(res["status"], "304 Not Modified")
+        res = self.request(IMAGE_URL, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(res["status"], "200 OK")
+
+    def test_precompressed_variant(self):
+        """Test gzip copy is served to clients accepting it"""
+        css = b"body { color: black; }" * 100
+        path = self.write_file(self.static_root, "app.0123456789ab.css", css)
+        self.write_file(self.static_root, path + ".gz", gzip.compress(css))
+        url = "/static/static/app.0123456789ab.css"
+
+        res = self.request(url, HTTP_ACCEPT_ENCODING="br;q=1.0, gzip;q=0.8")
+        self.assertEqual(res["headers"]["Content-Encoding"], "gzip")
+        self.assertEqual(res["headers"]["Vary"], "Accept-Encoding")
+        self.assertEqual(res["headers"]["Content-Type"], "text/css")
+        self.assertEqual(gzip.decompress(res["body"]), css)
+
+        res = self.request(url, HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertNotIn("Content-Encoding", res["headers"])
+        self.assertEqual(res["body"], css)
+
+    def test_range(self):
+        """Test partial content of single byte range"""
+        res = self.request(IMAGE_URL, HTTP_RANGE="bytes=10-19")
+
+        self.assertEqual(res["status"], "206 Partial Content")
+        self.assertEqual(res["body"], IMAGE_CONTENT[10:20])
+        self.assertEqual(res["headers"]["Content-Length"], "10")
+        self.assertEqual(
+            res["headers"]["Content-Range"], f"bytes 10-19/{len(IMAGE_CONTENT)}"
+        )
+
+        res = self.request(IMAGE_URL, HTTP_RANGE="bytes=-5")
+        self.assertEqual(res["body"], IMAGE_CONTENT[-5:])
+
+    def test_range_not_satisfiable(self):
+        """Test range starting after the end of file"""
+        res = self.request(IMAGE_URL, HTTP_RANGE="bytes=5000-")
+
+        self.assertEqual(res["status"], "416 Range Not Satisfiable")
+        self.assertEqual(res["headers"]["Content-Range"], "bytes */1024")
+
+    def test_stale_if_range_sends_whole_file(self):
+        """Test range of file changed since client got its part"""
+        res = self.request(
+            IMAGE_URL,
+            HTTP_RANGE="bytes=0-9",
+            HTTP_IF_RANGE=http_date(0),
+        )
+
+        self.assertEqual(res["status"], "200 OK")
+        self.assertEqual(res["body"], IMAGE_CONTENT)
+
+    def test_parse_range(self):
+        """Test range header parsing"""
+        self.assertEqual(parse_range("bytes=0-", 100), (0, 99))
+        self.assertEqual(parse_range("bytes=90-200", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-200", 100), (0, 99))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 100))
+        self.assertIsNone(parse_range("items=0-1", 100))
+        self.assertIsNone(parse_range("bytes=5-1", 100))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range("bytes=100-", 100)
+
+    @override_settings(FILES_ACCEL_REDIRECT_PREFIX="/protected/")
+    def test_accel_redirect(self):
+        """Test file is handed off to the web server"""
+        res = self.request(IMAGE_URL)
+
+        self.assertEqual(res["status"], "200 OK")
+        self.assertEqual(res["body"], b"")
+        self.assertEqual(res["headers"]["X-Accel-Redirect"], f"/protected{IMAGE_URL}")
+        self.assertIn("immutable", res["headers"]["Cache-Control"])
+
+
+class CompressedManifestStaticFilesStorageTests(SimpleTestCase):
+    """Test collectstatic writes hashed names with compressed copies"""
+
+    def test_collectstatic(self):
+        with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as root:
+            css = b"body { color: black; }\n" * 100
+            with open(os.path.join(source, "app.css"), "wb") as file:
+                file.write(css)
+            with open(os.path.join(source, "tiny.js"), "wb") as file:
+                file.write(b"1")
+
+            with override_settings(
+                STATIC_ROOT=root,
+                STATICFILES_DIRS=[source],
+                INSTALLED_APPS=["django.contrib.staticfiles"],
+            ):
+                call_command("collectstatic", interactive=False, verbosity=0)
+
+            names = os.listdir(root)
+            hashed = [name for name in names if name.startswith("app.")]
+            self.assertIn("staticfiles.json", names)
+            name = next(name for name in hashed if re.match(r"app\.\w{12}\.css$", name))
+            self.assertIn(f"{name}.gz", hashed)
+            with open(os.path.join(root, f"{name}.gz"), "rb") as file:
+                self.assertEqual(gzip.decompress(file.read()), css)
+            with open(os.path.join(root, f"{name}.br"), "rb") as file:
+                self.assertEqual(brotli.decompress(file.read()), css)
+            # Too small to compress
+            self.assertFalse([name for name in names if name.endswith(".js.gz")])
@@ -0,0 +1,116 @@
+import struct
+import zlib
+from io import BytesIO
+from PIL import Image
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.test import SimpleTestCase, override_settings
+from core.uploads import BoundedImageUploadHandler, RejectedUpload
+
+
+def png_chunk(chunk_type, data):
+    crc = zlib.crc32(chunk_type + data)
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+
+def create_png_header(width, height):
+    """PNG claiming the size with almost no pixel data, as decompression bombs"""
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + png_chunk(b"IHDR", header)
+        + png_chunk(b"IDAT", zlib.compress(b"\x00" * 16))
+        + png_chunk(b"IEND", b"")
+    )
+
+
+def create_jpeg(size=(10, 10)):
+    content = BytesIO()
+    Image.new("RGB", size).save(content, "JPEG")
+    return content.getvalue()
+
+
+@override_settings(
+    IMAGE_UPLOAD_MAX_SIZE=100_000,
+    IMAGE_UPLOAD_MAX_DIMENSIONS=(1000, 1000),
+    IMAGE_UPLOAD_MAX_PIXELS=500_000,
+    IMAGE_UPLOAD_HEADER_SIZE=1000,
+)
+class BoundedImageUploadHandlerTests(SimpleTestCase):
+    """Test uploaded images are checked while they are received"""
+
+    def upload(self, content, chunk_size=100, content_length=None):
+        handler = BoundedImageUploadHandler()
+        handler.handle_raw_input(None, {}, len(content), "boundary")
+        handler.new_file("image", "photo.jpg", "image/jpeg", content_length)
+        for start in range(0, len(content), chunk_size):
+            self.assertIsNone(
+                handler.receive_data_chunk(content[start : start + chunk_size], start)
+            )
+        return handler, handler.file_complete(len(content))
+
+    def test_valid_image_kept_in_memory(self):
+        """Test accepted image is returned as in-memory file"""
+        content = create_jpeg()
+        _, file = self.upload(content)
+
+        self.assertIsInstance(file, InMemoryUploadedFile)
+        self.assertEqual(file.read(), content)
+        self.assertEqual(file.size, len(content))
+
+    def test_oversized_file_rejected(self):
+        """Test data over the size limit is discarded"""
+        content = create_jpeg() + b"\x00" * 100_000
+        handler, file = self.upload(content)
+
+        self.assertIsInstance(file, RejectedUpload)
+        self.assertEqual(file.error, "Image must not exceed 100000 bytes.")
+        self.assertEqual(handler.file.tell(), 0)
+
+    def test_declared_oversized_file_rejected(self):
+        """Test file of too large declared length isn't stored at all"""
+        handler, file = self.upload(create_jpeg(), content_length=200_000)
+
+        self.assertIsInstance(file, RejectedUpload)
+        self.assertEqual(handler.file.tell(), 0)
+
+    def test_decompression_bomb_rejected_from_header(self):
+        """Test image of huge size is rejected by the first chunk"""
+        content = create_png_header(30000, 30000) + b"\x00" * 5000
+        handler = BoundedImageUploadHandler()
+        handler.handle_raw_input(None, {}, len(content), "boundary")
+        handler.new_file("image", "bomb.png", "image/png", None)
+        handler.receive_data_chunk(content[:200], 0)
+
+        self.assertEqual(handler.error, "Image must not exceed 500000 pixels.")
+        handler.receive_data_chunk(content[200:], 200)
+        self.assertEqual(handler.file.tell(), 0)
+        self.assertIsInstance(handler.file_complete(len(content)), RejectedUpload)
+
+    def test_dimensions_rejected(self):
+        """Test image larger than max dimensions"""
+        _, file = self.upload(create_png_header(2000, 10))
+
+        self.assertEqual(
+            file.error, "Image dimensions must not exceed 1000x1000 pixels."
+        )
+
+    def test_pixels_rejected(self):
+        """Test image within dimensions but of too many pixels"""
+        _, file = self.upload(create_png_header(1000, 1000))
+
+        self.assertEqual(file.error, "Image must not exceed 500000 pixels.")
+
+    @override_settings(IMAGE_UPLOAD_FORMATS=["PNG"])
+    def test_format_rejected(self):
+        """Test image of format not allowed"""
+        _, file = self.upload(create_jpeg())
+
+        self.assertIn("Unsupported image format", file.error)
+
+    def test_not_image_rejected(self):
+        """Test file without image header within header size"""
+        handler, file = self.upload(b"not image" * 200)
+
+        self.assertIsInstance(file, RejectedUpload)
+        self.assertIn("Upload a valid image", file.error)
+        self.assertEqual(handler.file.tell(), 0)
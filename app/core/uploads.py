@@ -0,0 +1,195 @@
+import warnings
+from io import BytesIO
+from PIL import Image
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import models
+from django.http.multipartparser import MultiPartParser as DjangoMultiPartParser
+from django.http.multipartparser import MultiPartParserError
+from rest_framework import exceptions, serializers
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+INVALID_IMAGE_MESSAGE = (
+    "Upload a valid image. The file you uploaded was either not an image "
+    "or a corrupted image."
+)
+
+
+def get_size_message():
+    return f"Image must not exceed {settings.IMAGE_UPLOAD_MAX_SIZE} bytes."
+
+
+def get_pixels_message():
+    return f"Image must not exceed {settings.IMAGE_UPLOAD_MAX_PIXELS} pixels."
+
+
+class UploadTooLarge(exceptions.APIException):
+    status_code = 413
+    default_detail = "Request body is too large."
+    default_code = "upload_too_large"
+
+
+def read_image_header(file):
+    """
+    Format and size of image read from its header only, Pillow decodes
+    pixels lazily. None when the header isn't complete or recognized,
+    DecompressionBombError is raised for images far over Pillow's limit
+    """
+    try:
+        with warnings.catch_warnings():
+            # Pixel count is checked against lower limits by the caller
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            with Image.open(file) as image:
+                return image.format, image.size
+    except (OSError, SyntaxError, ValueError):
+        return None
+
+
+def validate_image_header(image_format, size):
+    """Error message if image of the format and size isn't accepted"""
+    width, height = size
+    max_width, max_height = settings.IMAGE_UPLOAD_MAX_DIMENSIONS
+    if width > max_width or height > max_height:
+        return f"Image dimensions must not exceed {max_width}x{max_height} pixels."
+    if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+        return get_pixels_message()
+    if image_format not in settings.IMAGE_UPLOAD_FORMATS:
+        formats = ", ".join(settings.IMAGE_UPLOAD_FORMATS)
+        return f"Unsupported image format, use one of: {formats}."
+    return None
+
+
+class RejectedUpload(UploadedFile):
+    """Stand-in for uploaded file discarded while it was received"""
+
+    def __init__(self, name, error):
+        super().__init__(file=BytesIO(), name=name, size=0)
+        self.error = error
+
+
+class BoundedImageUploadHandler(FileUploadHandler):
+    """
+    Keep uploaded images in memory up to IMAGE_UPLOAD_MAX_SIZE bytes in total,
+    checking their header as soon as it arrives. Files over the limit and
+    images of too many pixels are rejected before they are decoded and the
+    rest of their data is discarded
+    """
+
+    def handle_raw_input(self, *args, **kwargs):
+        self.total_size = 0
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = BytesIO()
+        self.error = None
+        self.header_checked = False
+        if self.content_length and self.content_length > settings.IMAGE_UPLOAD_MAX_SIZE:
+            self.reject(get_size_message())
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error is not None:
+            return None
+        self.total_size += len(raw_data)
+        if self.total_size > settings.IMAGE_UPLOAD_MAX_SIZE:
+            self.reject(get_size_message())
+            return None
+
+        self.file.write(raw_data)
+        if not self.header_checked:
+            self.check_header(complete=False)
+        return None
+
+    def file_complete(self, file_size):
+        if self.error is None and not self.header_checked:
+            self.check_header(complete=True)
+        if self.error is not None:
+            return RejectedUpload(self.file_name, self.error)
+
+        self.file.seek(0)
+        return InMemoryUploadedFile(
+            file=self.file,
+            field_name=self.field_name,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+        )
+
+    def check_header(self, complete):
+        received = self.file.tell()
+        self.file.seek(0)
+        try:
+            header = read_image_header(self.file)
+        except Image.DecompressionBombError:
+            self.reject(get_pixels_message())
+            return
+        self.file.seek(received)
+        if header is None:
+            # Header is expected within the first bytes of the file
+            if complete or received >= settings.IMAGE_UPLOAD_HEADER_SIZE:
+                self.reject(INVALID_IMAGE_MESSAGE)
+            return
+
+        self.header_checked = True
+        error = validate_image_header(*header)
+        if error is not None:
+            self.reject(error)
+
+    def reject(self, error):
+        self.error = error
+        self.file = BytesIO()
+
+
+class ImageUploadParser(MultiPartParser):
+    """
+    Multipart parser streaming files through BoundedImageUploadHandler
+    instead of the default handlers, request body which can't fit the image
+    and other form fields is rejected before it is read
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context["request"]
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        meta = request.META.copy()
+        meta["CONTENT_TYPE"] = media_type
+
+        try:
+            content_length = int(meta.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            content_length = 0
+        max_length = settings.IMAGE_UPLOAD_MAX_SIZE + (
+            settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 0
+        )
+        if content_length > max_length:
+            raise UploadTooLarge()
+
+        upload_handlers = [BoundedImageUploadHandler(request)]
+        try:
+            parser = DjangoMultiPartParser(meta, stream, upload_handlers, encoding)
+            data, files = parser.parse()
+            return DataAndFiles(data, files)
+        except MultiPartParserError as exc:
+            raise exceptions.ParseError(f"Multipart form parse error - {exc}")
+
+
+class BoundedImageField(serializers.ImageField):
+    """Image field reporting uploads rejected by BoundedImageUploadHandler"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, RejectedUpload):
+            raise serializers.ValidationError(data.error)
+        if getattr(data, "size", 0) > settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(get_size_message())
+        return super().to_internal_value(data)
+
+
+class BoundedImageUploadMixin:
+    """ModelSerializer mixin validating model image fields by BoundedImageField"""
+
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: BoundedImageField,
+    }
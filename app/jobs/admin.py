@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "run_after", "updated_at")
+    list_filter = ("status", "name")
+    readonly_fields = ("attempts", "locked_at", "error", "created_at", "updated_at")
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,68 @@
+import multiprocessing
+import signal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from jobs.queue import work
+
+# Workers inherit loaded Django instead of importing it again
+context = multiprocessing.get_context("fork")
+
+
+def handle_stop_signals(stop):
+    """Finish the current job and stop on SIGINT or SIGTERM"""
+    return {
+        signum: signal.signal(signum, lambda *args: stop.set())
+        for signum in (signal.SIGINT, signal.SIGTERM)
+    }
+
+
+def run_worker_process(stop, burst):
+    handle_stop_signals(stop)
+    try:
+        work(burst=burst, stop=stop)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    """Django command to run queued jobs in worker processes"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes", type=int, default=settings.JOB_WORKER_PROCESSES
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit when there are no due jobs instead of waiting for new ones",
+        )
+
+    def handle(self, *args, **options):
+        processes = options["processes"]
+        burst = options["burst"]
+        self.stdout.write(f"Starting {processes} workers...")
+
+        stop = context.Event()
+        if processes == 1:
+            handlers = handle_stop_signals(stop)
+            try:
+                count = work(burst=burst, stop=stop)
+            finally:
+                for signum, handler in handlers.items():
+                    signal.signal(signum, handler)
+            self.stdout.write(self.style.SUCCESS(f"Worker ran {count} jobs!"))
+            return
+
+        # Forked processes must not share connections of the parent
+        connections.close_all()
+        workers = [
+            context.Process(target=run_worker_process, args=(stop, burst))
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        handle_stop_signals(stop)
+        for worker in workers:
+            worker.join()
+        self.stdout.write(self.style.SUCCESS("Workers stopped!"))
@@ -0,0 +1,47 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Function call queued to run by run_workers command"""
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+    # Dotted path of the function called with payload as keyword arguments
+    name = models.CharField(max_length=255)
+    payload = models.JSONField(blank=True, default=dict)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    # Not claimed before that time, used to delay retries
+    run_after = models.DateTimeField(default=timezone.now)
+    # When claimed by worker, running job is reclaimed if worker died
+    locked_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Keep claiming of the next due job index backed as done jobs pile up
+            models.Index(
+                fields=["run_after", "id"],
+                condition=Q(status="pending"),
+                name="job_pending_idx",
+            ),
+            models.Index(
+                fields=["locked_at"],
+                condition=Q(status="running"),
+                name="job_running_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
@@ -0,0 +1,144 @@
+import logging
+import threading
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(name, /, **payload):
+    """
+    Queue call of function by dotted path with payload as keyword arguments.
+    Workers see the job once the current transaction is committed
+    """
+    return Job.objects.create(name=name, payload=payload)
+
+
+def claim_job():
+    """
+    Mark the next due pending job as running and return it.
+    Rows locked by other workers are skipped instead of waited for,
+    jobs which used up their attempts are failed instead of claimed
+    """
+    while True:
+        with transaction.atomic():
+            job = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(status=Job.Status.PENDING, run_after__lte=timezone.now())
+                .order_by("run_after", "id")
+                .first()
+            )
+            if job is None:
+                return None
+            if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+                give_up_job(job, "Attempts used up before the job was claimed")
+                continue
+
+            job.status = Job.Status.RUNNING
+            job.attempts += 1
+            job.locked_at = timezone.now()
+            job.save(update_fields=["status", "attempts", "locked_at", "updated_at"])
+        return job
+
+
+def release_stale_jobs():
+    """
+    Return jobs of workers died while running them to the queue. Jobs which
+    used up their attempts are failed, the job itself may kill the worker.
+    Return number of released and failed jobs
+    """
+    stale = timezone.now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True).filter(
+                status=Job.Status.RUNNING, locked_at__lt=stale
+            )
+        )
+        released = [job.pk for job in jobs]
+        for job in jobs:
+            if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+                released.remove(job.pk)
+                give_up_job(job, "Worker died while running the job")
+
+        Job.objects.filter(pk__in=released).update(
+            status=Job.Status.PENDING, locked_at=None, updated_at=timezone.now()
+        )
+    return len(jobs)
+
+
+def give_up_job(job, error):
+    """Mark job which won't be retried as failed and call its failure handler"""
+    job.status = Job.Status.FAILED
+    job.error = error
+    job.locked_at = None
+    job.save(update_fields=["status", "error", "locked_at", "updated_at"])
+    call_failure_handler(job)
+
+
+def call_failure_handler(job):
+    """
+    Call on_failure attribute of the job function, if it has one, with the
+    job payload once the job is given up on. Errors of it are only logged
+    """
+    try:
+        handler = getattr(import_string(job.name), "on_failure", None)
+        if handler is not None:
+            with transaction.atomic():
+                handler(**job.payload)
+    except Exception:
+        logger.exception("Failure handler of job %s %s failed", job.pk, job.name)
+
+
+def run_job(job):
+    """
+    Call job function, failed one is retried later with growing delay.
+    Failure handler of the function is called when attempts run out
+    """
+    try:
+        with transaction.atomic():
+            import_string(job.name)(**job.payload)
+    except Exception:
+        logger.exception("Job %s %s failed", job.pk, job.name)
+        job.error = traceback.format_exc()
+        if job.attempts < settings.JOB_MAX_ATTEMPTS:
+            delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            job.status = Job.Status.PENDING
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+        else:
+            job.status = Job.Status.FAILED
+            call_failure_handler(job)
+    else:
+        job.status = Job.Status.DONE
+        job.error = ""
+
+    job.locked_at = None
+    job.save(update_fields=["status", "error", "run_after", "locked_at", "updated_at"])
+    return job
+
+
+def work(burst=False, stop=None):
+    """
+    Run due jobs one by one, polling for new ones when the queue is empty.
+    Return number of run jobs when queue is empty in burst mode or
+    stop event is set
+    """
+    stop = stop or threading.Event()
+    count = 0
+    release_stale_jobs()
+    while not stop.is_set():
+        job = claim_job()
+        if job is not None:
+            run_job(job)
+            count += 1
+            continue
+        if burst:
+            break
+
+        release_stale_jobs()
+        stop.wait(settings.JOB_POLL_INTERVAL)
+    return count
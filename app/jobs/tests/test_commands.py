@@ -0,0 +1,31 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from jobs.models import Job
+from jobs.queue import enqueue
+
+
+class RunWorkersTests(TestCase):
+    """Test run_workers command"""
+
+    def test_burst_single_process(self):
+        """Test worker runs due jobs in process and exits"""
+        enqueue("jobs.tests.test_queue.record")
+        out = StringIO()
+        call_command("run_workers", processes=1, burst=True, stdout=out)
+
+        self.assertIn("Worker ran 1 jobs!", out.getvalue())
+        self.assertEqual(Job.objects.get().status, Job.Status.DONE)
+
+
+class RunWorkerProcessesTests(TransactionTestCase):
+    """Test run_workers command with worker processes"""
+
+    def test_burst_processes(self):
+        """Test jobs are shared between forked workers and each runs once"""
+        for n in range(20):
+            enqueue("jobs.tests.test_queue.record", n=n)
+        call_command("run_workers", processes=3, burst=True, stdout=StringIO())
+
+        self.assertEqual(Job.objects.filter(status=Job.Status.DONE).count(), 20)
+        self.assertEqual(Job.objects.filter(attempts=1).count(), 20)
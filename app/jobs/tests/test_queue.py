@@ -0,0 +1,150 @@
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from jobs.models import Job
+from jobs.queue import claim_job, enqueue, release_stale_jobs, run_job, work
+
+calls = []
+
+
+def record(**kwargs):
+    """Job function used by tests"""
+    calls.append(kwargs)
+
+
+def fail(**kwargs):
+    raise ValueError("job failed")
+
+
+fail.on_failure = record
+
+
+class QueueTests(TestCase):
+    """Test database job queue"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_jobs_run_in_order(self):
+        """Test due jobs are run once in order of queueing"""
+        enqueue("jobs.tests.test_queue.record", n=1)
+        enqueue("jobs.tests.test_queue.record", n=2)
+        Job.objects.create(
+            name="jobs.tests.test_queue.record",
+            payload={"n": 3},
+            run_after=timezone.now() + timedelta(hours=1),
+        )
+
+        self.assertEqual(work(burst=True), 2)
+        self.assertEqual(calls, [{"n": 1}, {"n": 2}])
+        statuses = Job.objects.order_by("id").values_list("status", flat=True)
+        self.assertEqual(list(statuses), ["done", "done", "pending"])
+
+    @override_settings(JOB_MAX_ATTEMPTS=2, JOB_RETRY_DELAY=10)
+    def test_failed_job_retried(self):
+        """Test failed job is delayed for retry until max attempts"""
+        job = enqueue("jobs.tests.test_queue.fail")
+
+        with self.assertLogs("jobs.queue", "ERROR"):
+            run_job(claim_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.PENDING)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=9))
+        self.assertIn("job failed", job.error)
+        self.assertIsNone(claim_job())
+
+        Job.objects.update(run_after=timezone.now())
+        with self.assertLogs("jobs.queue", "ERROR"):
+            run_job(claim_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    @override_settings(JOB_MAX_ATTEMPTS=2)
+    def test_failure_handler_called_when_given_up(self):
+        """Test failure handler gets the payload once attempts run out"""
+        enqueue("jobs.tests.test_queue.fail", n=1)
+
+        with self.assertLogs("jobs.queue", "ERROR"):
+            run_job(claim_job())
+        self.assertEqual(calls, [])
+
+        Job.objects.update(run_after=timezone.now())
+        with self.assertLogs("jobs.queue", "ERROR"):
+            run_job(claim_job())
+        self.assertEqual(calls, [{"n": 1}])
+
+    def test_stale_job_released(self):
+        """Test job of worker died while running it is queued again"""
+        enqueue("jobs.tests.test_queue.record")
+        claim_job()
+        self.assertEqual(release_stale_jobs(), 0)
+
+        later = timezone.now() + timedelta(hours=1)
+        with patch("django.utils.timezone.now", return_value=later):
+            self.assertEqual(release_stale_jobs(), 1)
+        self.assertEqual(Job.objects.get().status, Job.Status.PENDING)
+
+    @override_settings(JOB_MAX_ATTEMPTS=2)
+    def test_job_killing_worker_given_up(self):
+        """Test job whose worker keeps dying fails once attempts run out"""
+        job = enqueue("jobs.tests.test_queue.fail", n=1)
+        later = timezone.now() + timedelta(hours=1)
+
+        # Worker dies without running the job to its end
+        for _ in range(2):
+            self.assertEqual(claim_job().pk, job.pk)
+            with patch("django.utils.timezone.now", return_value=later):
+                self.assertEqual(release_stale_jobs(), 1)
+            later += timedelta(hours=1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn("Worker died", job.error)
+        self.assertEqual(calls, [{"n": 1}])
+        self.assertIsNone(claim_job())
+
+    @override_settings(JOB_MAX_ATTEMPTS=2)
+    def test_job_over_attempts_not_claimed(self):
+        """Test pending job which used up its attempts is failed on claim"""
+        Job.objects.create(
+            name="jobs.tests.test_queue.fail", payload={"n": 1}, attempts=2
+        )
+        next_job = enqueue("jobs.tests.test_queue.record")
+
+        self.assertEqual(claim_job().pk, next_job.pk)
+        statuses = Job.objects.order_by("id").values_list("status", flat=True)
+        self.assertEqual(list(statuses), ["failed", "running"])
+        self.assertEqual(calls, [{"n": 1}])
+
+
+class ConcurrentClaimTests(TransactionTestCase):
+    """Test workers claim jobs concurrently"""
+
+    def test_locked_job_skipped(self):
+        """Test job locked by another worker is skipped instead of waited for"""
+        first = enqueue("jobs.tests.test_queue.record")
+        second = enqueue("jobs.tests.test_queue.record")
+        locked = threading.Event()
+        done = threading.Event()
+
+        def lock_first_job():
+            with transaction.atomic():
+                Job.objects.select_for_update().get(pk=first.pk)
+                locked.set()
+                done.wait(5)
+            connection.close()
+
+        thread = threading.Thread(target=lock_first_job)
+        thread.start()
+        locked.wait(5)
+        try:
+            self.assertEqual(claim_job().pk, second.pk)
+            self.assertIsNone(claim_job())
+        finally:
+            done.set()
+            thread.join()
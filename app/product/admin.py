@@ -3,7 +3,16 @@ from .models import Category, Product, Review
 
 
 class ProductAdmin(admin.ModelAdmin):
-    readonly_fields = ("rating",)
+    readonly_fields = (
+        "rating",
+        "review_count",
+        "rating_sum",
+        "rating_1_count",
+        "rating_2_count",
+        "rating_3_count",
+        "rating_4_count",
+        "rating_5_count",
+    )
 
 
 admin.site.register(Category)
@@ -0,0 +1,85 @@
+import json
+import math
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+from django_filters import rest_framework as filters
+from .models import Product, SEARCH_CONFIG
+
+
+class ProductFilter(filters.FilterSet):
+    """
+    Filter products by categories, full-text search query and properties
+    passed as prop.<key>=<value>[,<value>...] query params
+    """
+
+    property_prefix = "prop."
+
+    q = filters.CharFilter(method="search", label="Search query")
+    in_stock = filters.BooleanFilter(method="filter_in_stock", label="In stock")
+    updated_since = filters.IsoDateTimeFilter(
+        field_name="updated_at", lookup_expr="gte", label="Updated since"
+    )
+
+    class Meta:
+        model = Product
+        fields = {
+            "category": ["in"],
+            "price": ["gte", "lte"],
+            "created_at": ["gte", "lte"],
+        }
+
+    def filter_in_stock(self, queryset, name, value):
+        return queryset.filter(stock__gt=0) if value else queryset.filter(stock=0)
+
+    # Match stored search vector through GIN index and order by rank.
+    # Explicit "ordering" param overrides rank ordering
+    def search(self, queryset, name, value):
+        query = SearchQuery(value, config=SEARCH_CONFIG, search_type="websearch")
+        # Rank is real, cast to double so keyset cursor keeps it exact
+        rank = Cast(SearchRank(F("search_vector"), query), FloatField())
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(search_rank=rank)
+            .order_by("-search_rank", "id")
+        )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return queryset.filter(self.get_properties_filter())
+
+    # Any of comma separated values of the key and all of the keys match.
+    # Each value compiles to @> containment served by GIN index
+    def get_properties_filter(self):
+        condition = Q()
+        for param in self.data:
+            key = param[len(self.property_prefix) :]
+            if not param.startswith(self.property_prefix) or not key:
+                continue
+
+            values = {
+                value.strip()
+                for values in self.data.getlist(param)
+                for value in values.split(",")
+                if value.strip()
+            }
+            key_condition = Q()
+            for value in sorted(values):
+                for typed_value in self.parse_property_value(value):
+                    key_condition |= Q(properties__contains={key: typed_value})
+            condition &= key_condition
+        return condition
+
+    # Facets of numbers and booleans are counted by their text, e.g. "true"
+    # also matches JSON true and "300" matches 300. NaN, Infinity and
+    # overflowing numbers aren't valid jsonb, they only match as text
+    def parse_property_value(self, value):
+        try:
+            typed_value = json.loads(value)
+        except ValueError:
+            return [value]
+        if isinstance(typed_value, float) and not math.isfinite(typed_value):
+            return [value]
+        if isinstance(typed_value, (bool, int, float)):
+            return [typed_value, value]
+        return [value]
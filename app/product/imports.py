@@ -0,0 +1,287 @@
+import csv
+import io
+import json
+import math
+from itertools import islice
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from core.cache import bump_model_version
+from .models import Category, Product
+
+# Columns of imported rows, the rest are ignored
+REQUIRED_FIELDS = ["sku", "name", "price", "stock", "category"]
+OPTIONAL_FIELDS = ["description", "brand", "properties"]
+
+# Product fields validated one by one instead of whole model instances
+VALIDATED_FIELDS = [
+    field for field in REQUIRED_FIELDS + OPTIONAL_FIELDS if field != "category"
+]
+
+# Columns copied to the staging table, the rest get model defaults
+COPIED_COLUMNS = VALIDATED_FIELDS + ["category_id"]
+
+# Fields overwritten when product with the same SKU already exists
+UPDATE_FIELDS = [
+    "name",
+    "description",
+    "brand",
+    "price",
+    "stock",
+    "category_id",
+    "properties",
+    "updated_at",
+]
+
+UNDECODABLE_MESSAGE = "Must be UTF-8 encoded text."
+
+
+def open_text(file):
+    """
+    Read binary file as UTF-8 text. Undecodable bytes are kept as lone
+    surrogates so their rows are reported instead of failing the import
+    """
+    return io.TextIOWrapper(
+        file, encoding="utf-8", errors="surrogateescape", newline=""
+    )
+
+
+def is_undecodable(value):
+    try:
+        value.encode("utf-8")
+    except UnicodeEncodeError:
+        return True
+    return False
+
+
+def contains_null(value):
+    """Check for NUL characters which PostgreSQL text and jsonb can't store"""
+    if isinstance(value, str):
+        return "\x00" in value
+    if isinstance(value, dict):
+        return any(
+            contains_null(key) or contains_null(item) for key, item in value.items()
+        )
+    if isinstance(value, list):
+        return any(contains_null(item) for item in value)
+    return False
+
+
+def contains_non_finite(value):
+    """Check for NaN and infinite numbers which jsonb can't store"""
+    if isinstance(value, float):
+        return not math.isfinite(value)
+    if isinstance(value, dict):
+        return any(contains_non_finite(item) for item in value.values())
+    if isinstance(value, list):
+        return any(contains_non_finite(item) for item in value)
+    return False
+
+
+def read_rows(file, file_format):
+    """Iterate over rows of text CSV or NDJSON file without loading it whole"""
+    if file_format == "csv":
+        yield from csv.DictReader(file)
+        return
+
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+class ProductImporter:
+    """
+    Upsert products by SKU in batches. Rows are validated field by field,
+    categories are taken from the preloaded map and each batch is loaded
+    into a staging table by COPY, then written with one
+    INSERT ... SELECT ... ON CONFLICT (sku) DO UPDATE.
+    Invalid rows are reported and skipped, the rest of the batch is saved
+    """
+
+    staging_table = "product_import"
+
+    def __init__(self, batch_size=None, using="default"):
+        self.batch_size = batch_size or settings.PRODUCT_IMPORT_BATCH_SIZE
+        self.connection = connections[using]
+        # Category pks by name lower-cased by database and the lowered names
+        self.categories = {}
+        self.category_keys = {}
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    def run(self, rows):
+        self.categories = dict(
+            Category.objects.with_lower_name().values_list("lower_name", "pk")
+        )
+        table = self.connection.ops.quote_name(Product._meta.db_table)
+        columns = ", ".join(COPIED_COLUMNS)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TEMPORARY TABLE IF NOT EXISTS {self.staging_table}
+                AS SELECT {columns} FROM {table} WITH NO DATA
+                """)
+        try:
+            rows = enumerate(rows, start=1)
+            while batch := list(islice(rows, self.batch_size)):
+                self.import_batch(batch)
+        finally:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {self.staging_table}")
+
+        # Bulk queries don't send post_save which invalidates cached responses
+        bump_model_version(Category)
+        bump_model_version(Product)
+        return {
+            "imported": self.created + self.updated,
+            "created": self.created,
+            "updated": self.updated,
+            "errors": self.errors,
+        }
+
+    def import_batch(self, batch):
+        skus = set()
+        rows = []
+        for number, row in batch:
+            try:
+                data = self.clean_row(row)
+            except ValidationError as error:
+                self.add_error(number, error)
+                continue
+            if data["sku"] in skus:
+                self.add_error(number, ValidationError({"sku": "Repeats in batch."}))
+                continue
+            skus.add(data["sku"])
+            rows.append(data)
+        if not rows:
+            return
+
+        self.resolve_categories({data["category"] for data in rows})
+        content = io.StringIO()
+        writer = csv.writer(content, quoting=csv.QUOTE_ALL)
+        for data in rows:
+            category_id = self.categories[self.category_keys[data["category"]]]
+            data["properties"] = json.dumps(data["properties"], ensure_ascii=False)
+            writer.writerow([data[field] for field in VALIDATED_FIELDS] + [category_id])
+        content.seek(0)
+
+        with transaction.atomic(using=self.connection.alias):
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"TRUNCATE {self.staging_table}")
+                cursor.copy_expert(
+                    f"COPY {self.staging_table} ({', '.join(COPIED_COLUMNS)}) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    content,
+                )
+                cursor.execute(*self.get_upsert_sql())
+                created = sum(inserted for inserted, in cursor.fetchall())
+        self.created += created
+        self.updated += len(rows) - created
+
+    # Columns not imported get model defaults, xmax is 0 for inserted rows
+    def get_upsert_sql(self):
+        quote_name = self.connection.ops.quote_name
+        skipped = COPIED_COLUMNS + ["id", "search_vector", "created_at", "updated_at"]
+        default_fields = [
+            field
+            for field in Product._meta.concrete_fields
+            if field.attname not in skipped
+        ]
+        params = [
+            field.get_db_prep_save(field.get_default(), self.connection)
+            for field in default_fields
+        ]
+        columns = COPIED_COLUMNS + [field.column for field in default_fields]
+        defaults = ", ".join(["%s"] * len(default_fields))
+        updates = ", ".join(
+            f"{quote_name(field)} = EXCLUDED.{quote_name(field)}"
+            for field in UPDATE_FIELDS
+        )
+        sql = f"""
+            INSERT INTO {quote_name(Product._meta.db_table)}
+                ({", ".join(map(quote_name, columns))}, created_at, updated_at)
+            SELECT {", ".join(COPIED_COLUMNS)}, {defaults}, now(), now()
+            FROM {self.staging_table}
+            ON CONFLICT (sku) DO UPDATE SET {updates}
+            RETURNING xmax = 0
+        """
+        return sql, params
+
+    def clean_row(self, row):
+        if not isinstance(row, dict):
+            raise ValidationError("Row must be a JSON object.")
+
+        data = {}
+        errors = {}
+        for field in REQUIRED_FIELDS + OPTIONAL_FIELDS:
+            value = row.get(field)
+            if isinstance(value, str):
+                value = value.strip()
+            if value in (None, ""):
+                if field in REQUIRED_FIELDS:
+                    errors[field] = "This field is required."
+                continue
+            if is_undecodable(json.dumps(value, ensure_ascii=False)):
+                errors[field] = UNDECODABLE_MESSAGE
+                continue
+            if contains_null(value):
+                errors[field] = "Null characters are not allowed."
+                continue
+            data[field] = value
+
+        # CSV cells hold properties as JSON text
+        properties = data.get("properties", {})
+        if isinstance(properties, str):
+            try:
+                properties = json.loads(properties)
+            except ValueError:
+                properties = None
+        if not isinstance(properties, dict) and "properties" not in errors:
+            errors["properties"] = "Must be a JSON object."
+        elif contains_non_finite(properties):
+            errors["properties"] = "NaN and Infinity are not allowed."
+        data["properties"] = properties
+
+        data["category"] = str(data.get("category", ""))
+        if len(data["category"]) > Category._meta.get_field("name").max_length:
+            errors["category"] = "Category name is too long."
+
+        # Same field validation as Product.full_clean without the instance,
+        # uniqueness is left to upsert
+        for name in VALIDATED_FIELDS:
+            if name in errors:
+                continue
+            field = Product._meta.get_field(name)
+            value = data.get(name, field.get_default())
+            try:
+                data[name] = field.clean(value, None)
+            except ValidationError as error:
+                errors[name] = error.messages
+
+        if errors:
+            raise ValidationError(errors)
+        return data
+
+    # Lower-case new names by database, str.lower differs for some letters,
+    # and create categories missing from the map with 2 queries
+    def resolve_categories(self, names):
+        unknown = [name for name in names if name not in self.category_keys]
+        self.category_keys.update(Category.objects.lower_names(unknown))
+        missing = {
+            name for name in names if self.category_keys[name] not in self.categories
+        }
+        if missing:
+            categories = Category.objects.get_or_create_many(missing)
+            self.categories.update(
+                (lower_name, category.pk) for lower_name, category in categories.items()
+            )
+
+    def add_error(self, number, error):
+        messages = (
+            error.message_dict if hasattr(error, "error_dict") else error.messages
+        )
+        self.errors.append({"row": number, "errors": messages})
@@ -0,0 +1,81 @@
+import json
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from product.filters import ProductFilter
+from product.models import Category, Product
+
+WORDS = [
+    "jacket", "hoodie", "running", "shoes", "trousers", "cargo", "waterproof",
+    "shell", "fleece", "thermal", "windbreaker", "parka", "vest", "sneakers",
+    "boots", "cotton", "nylon", "reflective", "tactical", "oversized",
+]  # fmt: skip
+
+# Insert rows in one statement, words are picked by row number
+SEED_PRODUCTS = """
+INSERT INTO product_product (
+    name, description, brand, price, stock, rating, review_count, rating_sum,
+    rating_1_count, rating_2_count, rating_3_count, rating_4_count,
+    rating_5_count, category_id, properties, image_widths, created_at, updated_at
+)
+SELECT
+    initcap(w[1 + i %% 20] || ' ' || w[1 + (i / 20) %% 20]) || ' ' || i,
+    w[1 + (i / 400) %% 20] || ' ' || w[1 + (i / 7) %% 20] || ' made of '
+        || w[1 + (i / 13) %% 20] || ' for everyday wear',
+    'Brand ' || i %% 500,
+    10 + i %% 990, 100, 0, 0, 0, 0, 0, 0, 0, 0, %s, '{}', '{}', now(), now()
+FROM generate_series(1, %s) AS i, (SELECT %s::text[] AS w) AS words
+"""
+
+
+class Command(BaseCommand):
+    """
+    Django command to measure product search query time on a seeded
+    catalog. Products are inserted in a transaction rolled back at the end
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1_000_000)
+        parser.add_argument(
+            "--query",
+            action="append",
+            dest="queries",
+            help="Search query to measure, can be passed multiple times",
+        )
+
+    def handle(self, *args, **options):
+        queries = options["queries"] or [
+            "parka",
+            "waterproof jacket",
+            "tactical -boots",
+        ]
+
+        with transaction.atomic():
+            self.seed(options["products"])
+            for query in queries:
+                self.measure(query)
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        self.stdout.write(f"Seeding {count} products...")
+        category = Category.objects.create(name="benchmark search category")
+        with connection.cursor() as cursor:
+            cursor.execute(SEED_PRODUCTS, [category.id, count, WORDS])
+            cursor.execute("ANALYZE product_product")
+
+    def measure(self, query):
+        filterset = ProductFilter({"q": query}, queryset=Product.objects.all())
+        sql, params = filterset.qs[:100].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        uses_index = "product_search_vector_idx" in json.dumps(plan)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{query!r}: {plan[0]['Execution Time']:.1f} ms execution, "
+                f"{plan[0]['Planning Time']:.1f} ms planning, "
+                f"GIN index {'used' if uses_index else 'not used'}"
+            )
+        )
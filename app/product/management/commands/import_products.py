@@ -0,0 +1,44 @@
+import sys
+from django.core.management.base import BaseCommand
+from product.imports import ProductImporter, open_text, read_rows
+
+
+class Command(BaseCommand):
+    """
+    Django command to upsert products by SKU from CSV or NDJSON file.
+    Invalid rows are reported and skipped
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, - to read stdin")
+        parser.add_argument(
+            "--format",
+            choices=["ndjson", "csv"],
+            dest="file_format",
+            help="File format, detected by file extension by default",
+        )
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["file_format"]
+        if not file_format:
+            file_format = "csv" if path.lower().endswith(".csv") else "ndjson"
+
+        self.stdout.write(f"Importing products from {path}...")
+        importer = ProductImporter(options["batch_size"])
+        if path == "-":
+            report = importer.run(read_rows(open_text(sys.stdin.buffer), file_format))
+        else:
+            with open(path, "rb") as file:
+                report = importer.run(read_rows(open_text(file), file_format))
+
+        for error in report["errors"]:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {report['imported']} products "
+                f"({report['created']} created, {report['updated']} updated), "
+                f"{len(report['errors'])} rows skipped!"
+            )
+        )
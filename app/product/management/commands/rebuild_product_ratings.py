@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, Now
+from core.cache import bump_model_version
+from product.models import Product, Review
+
+
+class Command(BaseCommand):
+    """Django command to rebuild product rating counters from reviews"""
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding product ratings...")
+
+        reviews = Review.objects.filter(product=OuterRef("pk")).order_by()
+
+        # Aggregate product reviews in correlated subquery
+        def aggregate(expression, default=0):
+            values = reviews.values("product").annotate(value=expression)
+            return Coalesce(Subquery(values.values("value")), default)
+
+        histogram = {
+            f"rating_{stars}_count": aggregate(Count("id", filter=Q(rating=stars)))
+            for stars in range(1, 6)
+        }
+        updated = Product.objects.update(
+            review_count=aggregate(Count("id")),
+            rating_sum=aggregate(Sum("rating")),
+            rating=aggregate(Avg("rating"), default=0.0),
+            updated_at=Now(),
+            **histogram,
+        )
+        bump_model_version(Product)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {updated} product ratings!"))
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:02
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_rating_counters(apps, schema_editor):
+    Product = apps.get_model("product", "Product")
+    Review = apps.get_model("product", "Review")
+    reviews = Review.objects.filter(product=OuterRef("pk")).order_by().values("product")
+    Product.objects.update(
+        review_count=Coalesce(
+            Subquery(reviews.annotate(value=Count("id")).values("value")), 0
+        ),
+        rating_sum=Coalesce(
+            Subquery(reviews.annotate(value=Sum("rating")).values("value")), 0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0003_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_rating_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_rating_histogram(apps, schema_editor):
+    Product = apps.get_model("product", "Product")
+    Review = apps.get_model("product", "Review")
+    reviews = Review.objects.filter(product=OuterRef("pk")).order_by().values("product")
+    Product.objects.update(
+        **{
+            f"rating_{stars}_count": Coalesce(
+                Subquery(
+                    reviews.annotate(
+                        value=Count("id", filter=Q(rating=stars))
+                    ).values("value")
+                ),
+                0,
+            )
+            for stars in range(1, 6)
+        }
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0004_product_rating_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_rating_histogram, migrations.RunPython.noop),
+    ]
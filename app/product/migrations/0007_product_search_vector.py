@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:18
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Recompute search vector on insert and on update of searchable fields
+CREATE_TRIGGER = """
+CREATE FUNCTION product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.brand, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER product_search_vector_trigger
+BEFORE INSERT OR UPDATE OF name, brand, description, search_vector
+ON product_product
+FOR EACH ROW EXECUTE FUNCTION product_search_vector_update();
+
+UPDATE product_product SET search_vector = NULL;
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER product_search_vector_trigger ON product_product;
+DROP FUNCTION product_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0006_category_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        migrations.AddIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="product_search_vector_idx"
+            ),
+        ),
+    ]
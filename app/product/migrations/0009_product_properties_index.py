@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:25
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0008_product_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["properties"],
+                name="product_properties_idx",
+                opclasses=["jsonb_path_ops"],
+            ),
+        ),
+    ]
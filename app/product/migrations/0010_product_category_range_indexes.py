@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0009_product_properties_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["category", "price", "id"], name="product_category_price_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["category", "created_at", "id"],
+                name="product_category_created_idx",
+            ),
+        ),
+        # Drop category index only after composite ones cover it
+        migrations.AlterField(
+            model_name="product",
+            name="category",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="product.category",
+            ),
+        ),
+    ]
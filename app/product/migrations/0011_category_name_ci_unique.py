@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:32
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.db.models.functions import Lower
+import django.db.models.functions.text
+
+
+def merge_duplicate_categories(apps, schema_editor):
+    """Merge categories left by concurrent creates before adding constraint"""
+    Category = apps.get_model("product", "Category")
+    Product = apps.get_model("product", "Product")
+    categories = Category.objects.annotate(lower_name=Lower("name"))
+    duplicates = (
+        categories.values("lower_name")
+        .annotate(first_id=Min("id"), count=Count("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        same_categories = categories.filter(lower_name=duplicate["lower_name"]).exclude(
+            pk=duplicate["first_id"]
+        )
+        Product.objects.filter(category__in=same_categories).update(
+            category=duplicate["first_id"]
+        )
+        same_categories.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0010_product_category_range_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_categories, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="category",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("name"),
+                name="unique_category_name_ci",
+                violation_error_message="Category with this Name already exists!",
+            ),
+        ),
+        # Case-insensitive constraint covers exact uniqueness too
+        migrations.AlterField(
+            model_name="category",
+            name="name",
+            field=models.CharField(max_length=100),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0012_product_sku"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="image_widths",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:51
+
+import core.files
+from django.db import migrations
+import product.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0013_product_image_widths"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="product",
+            name="image",
+            field=core.files.ContentAddressedImageField(
+                blank=True,
+                null=True,
+                upload_to=product.models.generate_product_image_path,
+            ),
+        ),
+    ]
@@ -1,23 +1,68 @@
 import os
 from uuid import uuid4
-from django.db import models
+from django.db import connections, models
+from core.files import ContentAddressedImageField
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest, Lower, Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField, TrigramWordSimilarity
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 
 
+class CategoryQuerySet(models.QuerySet):
+    def with_lower_name(self):
+        return self.annotate(lower_name=Lower("name"))
+
+    def lower_names(self, names):
+        """
+        Map names to their lower case by database, which is what the
+        case-insensitive constraint compares and may differ from str.lower
+        """
+        names = list(set(names))
+        if not names:
+            return {}
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                "SELECT name, lower(name) FROM unnest(%s::text[]) AS name", [names]
+            )
+            return dict(cursor.fetchall())
+
+    def get_or_create_many(self, names):
+        """
+        Get categories by names in case-insensitive manner, creating
+        missing ones with one INSERT ... ON CONFLICT DO NOTHING.
+        Return dict of categories by name lower-cased by database
+        """
+        # The first spelling of the same name wins, database dedupes them
+        names = list(dict.fromkeys(names))
+        self.bulk_create(
+            [self.model(name=name) for name in names], ignore_conflicts=True
+        )
+        lower_names = RawSQL(
+            "SELECT lower(name) FROM unnest(%s::text[]) AS name", [names]
+        )
+        categories = self.with_lower_name().filter(lower_name__in=lower_names)
+        return {category.lower_name: category for category in categories}
+
+
 class Category(models.Model):
-    name = models.CharField(max_length=100, unique=True)
+    name = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
 
-    # Ensure name is unique in case-insensitive manner before saving
-    def save(self, *args, **kwargs):
-        if Category.objects.filter(
-            name__iexact=self.name,
-        ):
-            msg = f"Category with this Name ({self.name}) already exists!"
-            raise ValueError(msg)
+    objects = CategoryQuerySet.as_manager()
 
-        super().save(*args, **kwargs)
+    class Meta:
+        constraints = [
+            # Ensure name is unique in case-insensitive manner
+            models.UniqueConstraint(
+                Lower("name"),
+                name="unique_category_name_ci",
+                violation_error_message="Category with this Name already exists!",
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -31,6 +76,10 @@ def validate_unique_keys(value):
         raise ValidationError(f"Property key duplication: {duplicating_keys}")
 
 
+# Text search configuration used by search vector trigger and queries
+SEARCH_CONFIG = "english"
+
+
 def generate_product_image_path(instance, filename):
     """Generate product image path with unique uuid filename"""
     extension = os.path.splitext(filename)[1]
@@ -38,7 +87,65 @@ def generate_product_image_path(instance, filename):
     return os.path.join("uploads", "product", filename)
 
 
+class ProductQuerySet(models.QuerySet):
+    def autocomplete(self, term):
+        """
+        Products whose name or brand starts with the term or has a word
+        similar to it, so typos still match. Prefix matches go first,
+        then the most similar ones
+        """
+        term_upper = term.upper()
+        # Compare upper-cased fields to use the trigram expression indexes
+        queryset = self.annotate(upper_name=Upper("name"), upper_brand=Upper("brand"))
+        is_prefix = Q(upper_name__startswith=term_upper) | Q(
+            upper_brand__startswith=term_upper
+        )
+        is_similar = Q(upper_name__trigram_word_similar=term) | Q(
+            upper_brand__trigram_word_similar=term
+        )
+        return (
+            queryset.filter(is_prefix | is_similar)
+            .annotate(
+                is_prefix=models.ExpressionWrapper(
+                    is_prefix, output_field=models.BooleanField()
+                ),
+                similarity=Greatest(
+                    TrigramWordSimilarity(term, "upper_name"),
+                    TrigramWordSimilarity(term, "upper_brand"),
+                ),
+            )
+            .order_by("-is_prefix", "-similarity", "name", "id")
+        )
+
+    def property_facets(self):
+        """
+        Count products of the queryset per value of each property
+        in a single query, e.g. {"color": {"black": 3, "white": 1}}
+        """
+        connection = connections[self.db]
+        sql, params = self.order_by().values("properties").query.sql_with_params()
+        # Nested objects and arrays aren't facet values
+        sql = f"""
+            SELECT property.key, property.value #>> '{{}}', COUNT(*)
+            FROM ({sql}) AS product
+            CROSS JOIN LATERAL jsonb_each(product.properties) AS property
+            WHERE jsonb_typeof(property.value) IN ('string', 'number', 'boolean')
+            GROUP BY 1, 2
+            ORDER BY 1, 3 DESC, 2
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        facets = {}
+        for key, value, count in rows:
+            facets.setdefault(key, {})[value] = count
+        return facets
+
+
 class Product(models.Model):
+    # Supplier stock keeping unit, bulk import upserts products by it
+    sku = models.CharField(max_length=64, unique=True, blank=True, null=True)
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     brand = models.CharField(max_length=100, blank=True)
@@ -48,29 +155,85 @@ class Product(models.Model):
         validators=[MinValueValidator(1)],
     )
     stock = models.IntegerField(validators=[MinValueValidator(0)])
-    image = models.ImageField(
+    image = ContentAddressedImageField(
         upload_to=generate_product_image_path,
         blank=True,
         null=True,
     )
+    # Widths of resized image copies by size name, None when they couldn't
+    # be made, see core.images
+    image_widths = models.JSONField(blank=True, null=True, default=dict, editable=False)
     rating = models.FloatField(
         blank=True,
         default=0,
         validators=[MinValueValidator(0), MaxValueValidator(5)],
     )
-    category = models.ForeignKey(to=Category, on_delete=models.CASCADE)
+    # Counters of product reviews to derive rating without aggregation
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    # Rating histogram, number of reviews with each of 1-5 stars
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+    # Composite category indexes below cover lookups by category
+    category = models.ForeignKey(to=Category, on_delete=models.CASCADE, db_index=False)
     properties = models.JSONField(
         blank=True,
         default=dict,
         validators=[validate_unique_keys],
     )
 
+    # Weighted name, brand and description lexemes for full-text search.
+    # Kept current by database trigger, see migration 0007
+    search_vector = SearchVectorField(null=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="product_search_vector_idx"),
+            # Serve properties containment (@>) queries of facet filters
+            GinIndex(
+                fields=["properties"],
+                opclasses=["jsonb_path_ops"],
+                name="product_properties_idx",
+            ),
+            # Serve case-insensitive prefix and trigram similarity autocomplete
+            GinIndex(
+                OpClass(Upper("name"), name="gin_trgm_ops"),
+                name="product_name_trgm_idx",
+            ),
+            GinIndex(
+                OpClass(Upper("brand"), name="gin_trgm_ops"),
+                name="product_brand_trgm_idx",
+            ),
+            # Keep keyset pagination over ordering fields index backed
+            models.Index(fields=["price", "id"], name="product_price_id_idx"),
+            # Serve category filter combined with price or date ranges and order
+            models.Index(
+                fields=["category", "price", "id"], name="product_category_price_idx"
+            ),
+            models.Index(
+                fields=["category", "created_at", "id"],
+                name="product_category_created_idx",
+            ),
+            models.Index(fields=["rating", "id"], name="product_rating_id_idx"),
+            models.Index(fields=["created_at", "id"], name="product_created_id_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
+    @property
+    def rating_histogram(self):
+        """Number of reviews per star from 1 to 5"""
+        return {stars: getattr(self, f"rating_{stars}_count") for stars in range(1, 6)}
+
     # Override save to validate fields before saving.
     # Otherwise validation doesn't work when manually saving instances via ORM
     def save(self, *args, **kwargs):
@@ -90,6 +253,11 @@ class Review(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
+        indexes = [
+            # Keep keyset pagination over ordering fields index backed
+            models.Index(fields=["rating", "id"], name="review_rating_id_idx"),
+            models.Index(fields=["created_at", "id"], name="review_created_id_idx"),
+        ]
         constraints = [
             # Ensure user can leave only 1 review for the product
             models.UniqueConstraint(
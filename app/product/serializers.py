@@ -1,4 +1,9 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
+from core.cache import bump_model_version
+from core.images import ImageDerivativesMixin, ImageSrcsetField, ImageStatusField
+from core.uploads import BoundedImageUploadMixin
 from .models import Category, Product, Review
 
 
@@ -8,8 +13,41 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ["id", "name"]
         read_only_fields = ["id"]
 
+    # Name uniqueness is checked by database constraint instead of a query
+    def save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError as error:
+            if "unique_category_name_ci" not in str(error):
+                raise
+            name = self.validated_data["name"]
+            msg = f"Category with this Name ({name}) already exists!"
+            raise serializers.ValidationError({"name": [msg]})
+
+
+class CategoryBulkSerializer(serializers.Serializer):
+    """Get or create many categories by names with 2 queries"""
+
+    names = serializers.ListField(
+        child=serializers.CharField(max_length=100),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+    def create(self, validated_data):
+        categories = Category.objects.get_or_create_many(validated_data["names"])
+        # Bulk insert doesn't send post_save which invalidates cached responses
+        bump_model_version(Category)
+        return sorted(categories.values(), key=lambda category: category.id)
+
+    def to_representation(self, instance):
+        return {"categories": CategorySerializer(instance, many=True).data}
+
 
 class ProductSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField("image")
+
     class Meta:
         model = Product
         fields = [
@@ -18,32 +56,124 @@ class ProductSerializer(serializers.ModelSerializer):
             "brand",
             "price",
             "image",
+            "image_srcset",
             "rating",
         ]
         read_only_fields = ["id", "image", "rating"]
 
 
+class ProductAutocompleteSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ["id", "name", "brand"]
+        read_only_fields = fields
+
+
+class ProductAutocompleteQuerySerializer(serializers.Serializer):
+    """Validate autocomplete query params"""
+
+    q = serializers.CharField(max_length=100)
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.PRODUCT_AUTOCOMPLETE_MAX_LIMIT,
+        default=settings.PRODUCT_AUTOCOMPLETE_LIMIT,
+    )
+
+
+class ProductExportSerializer(serializers.ModelSerializer):
+    """Flat product row of catalog export"""
+
+    category_name = serializers.CharField(source="category.name", read_only=True)
+
+    class Meta:
+        model = Product
+        fields = [
+            "id",
+            "sku",
+            "name",
+            "brand",
+            "description",
+            "price",
+            "stock",
+            "rating",
+            "review_count",
+            "category",
+            "category_name",
+            "properties",
+            "image",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+
+class ProductExportQuerySerializer(serializers.Serializer):
+    """Validate export query params"""
+
+    file_format = serializers.ChoiceField(["ndjson", "csv"], default="ndjson")
+
+
+class ProductImportSerializer(serializers.Serializer):
+    """Validate uploaded product import file"""
+
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(["ndjson", "csv"], default="ndjson")
+
+
+class ProductStatsSerializer(serializers.ModelSerializer):
+    """Review statistics read from product counters"""
+
+    histogram = serializers.DictField(
+        source="rating_histogram",
+        child=serializers.IntegerField(),
+        read_only=True,
+    )
+
+    class Meta:
+        model = Product
+        fields = ["rating", "review_count", "histogram"]
+        read_only_fields = fields
+
+
 class ProductDetailSerializer(ProductSerializer):
+    # Included only when requested with "?include=stats"
+    stats = ProductStatsSerializer(source="*", read_only=True)
+
     class Meta(ProductSerializer.Meta):
         fields = ProductSerializer.Meta.fields + [
+            "sku",
             "description",
             "stock",
             "category",
             "properties",
             "created_at",
             "updated_at",
+            "stats",
         ]
         read_only_fields = ProductSerializer.Meta.read_only_fields + [
             "created_at",
             "updated_at",
         ]
 
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        include = request.query_params.get("include", "") if request else ""
+        if "stats" not in include.split(","):
+            fields.pop("stats")
+        return fields
+
 
 # Simplified one to return only product id and image in response
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(
+    BoundedImageUploadMixin, ImageDerivativesMixin, serializers.ModelSerializer
+):
+    image_srcset = ImageSrcsetField("image")
+    image_status = ImageStatusField("image")
+
     class Meta:
         model = Product
-        fields = ["id", "image"]
+        fields = ["id", "image", "image_srcset", "image_status"]
         read_only_fields = ["id"]
         extra_kwargs = {"image": {"required": True}}
 
@@ -1,18 +1,94 @@
 from django.dispatch import receiver
-from django.db.models import Avg
-from django.db.models.signals import m2m_changed, post_save, post_delete
-from .models import Product, Review
+from django.db.models import DEFERRED, F, FloatField
+from django.db.models.functions import Cast, Coalesce, Now, NullIf
+from django.db.models.signals import (
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from core.cache import bump_model_version
+from .models import Category, Product, Review
+
+
+# Invalidate cached catalog responses whenever category or product changes
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_catalog_version(sender, **kwargs):
+    bump_model_version(sender)
+
+
+# Remember the stored rating to update product counters by delta. Rating
+# deferred by only() or defer() is left unread, reading it costs a query
+@receiver(post_init, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._stored_rating = None
+    else:
+        instance._stored_rating = instance.__dict__.get("rating", DEFERRED)
+
+
+# Stored rating is needed for the delta once review gets a new rating or
+# is deleted, load it if it was deferred
+@receiver(pre_save, sender=Review)
+@receiver(pre_delete, sender=Review)
+def load_stored_review_rating(sender, instance, signal, **kwargs):
+    if instance._stored_rating is not DEFERRED:
+        return
+    if signal is pre_delete or "rating" in instance.__dict__:
+        instance._stored_rating = (
+            Review.objects.filter(pk=instance.pk)
+            .values_list("rating", flat=True)
+            .first()
+        )
 
 
 # Update product rating whenever review for it saved or deleted
 @receiver(post_save, sender=Review)
 @receiver(post_delete, sender=Review)
-def update_product_rating(sender, instance, **kwargs):
-    product = instance.product
-    reviews = product.review_set.all()
-    avg_rating_dict = reviews.aggregate(Avg("rating"))
-    avg_rating = avg_rating_dict["rating__avg"]
-
-    # If average rating is None or 0 then set 0
-    product.rating = avg_rating or 0
-    product.save()
+def update_product_rating(sender, instance, signal, created=False, **kwargs):
+    old_rating = None if created else instance._stored_rating
+    if signal is post_delete:
+        new_rating = None
+    else:
+        new_rating = instance.__dict__.get("rating", DEFERRED)
+    instance._stored_rating = new_rating
+
+    # Delta is unknown when rating of the loaded review was deferred
+    if old_rating is DEFERRED or new_rating is DEFERRED:
+        return
+    if old_rating == new_rating:
+        return
+
+    # Shift counters atomically in db so concurrent reviews don't race.
+    # SET expressions see the row before update so rating uses new values
+    count_delta = (new_rating is not None) - (old_rating is not None)
+    review_count = F("review_count") + count_delta
+    rating_sum = F("rating_sum") + (new_rating or 0) - (old_rating or 0)
+    counters = {
+        "review_count": review_count,
+        "rating_sum": rating_sum,
+        "rating": Coalesce(
+            Cast(rating_sum, FloatField()) / NullIf(review_count, 0),
+            0.0,
+        ),
+        # Queryset update doesn't touch auto_now field
+        "updated_at": Now(),
+    }
+    if old_rating is not None:
+        field = f"rating_{old_rating}_count"
+        counters[field] = F(field) - 1
+    if new_rating is not None:
+        field = f"rating_{new_rating}_count"
+        counters[field] = F(field) + 1
+
+    updated = Product.objects.filter(pk=instance.product_id).update(**counters)
+    # Queryset update doesn't send post_save of product
+    bump_model_version(Product)
+
+    # Keep already loaded product in sync with db
+    if updated and Review.product.is_cached(instance):
+        instance.product.refresh_from_db(fields=list(counters))
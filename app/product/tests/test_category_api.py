@@ -8,6 +8,7 @@ from product.models import Category
 from product.serializers import CategorySerializer
 
 CATEGORY_LIST_URL = reverse("product:category-list")
+CATEGORY_BULK_URL = reverse("product:category-bulk")
 
 
 def get_detail_url(category_id):
@@ -43,6 +44,18 @@ class PublicCategoryAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, category_serializer.data)
 
+    def test_cached_list_invalidated(self):
+        """Test new category shows up in already cached list"""
+        create_category("category_1")
+        self.client.get(CATEGORY_LIST_URL)
+        with self.assertNumQueries(0):
+            self.client.get(CATEGORY_LIST_URL)
+
+        create_category("category_2")
+        res = self.client.get(CATEGORY_LIST_URL)
+
+        self.assertEqual(len(res.data["results"]), 2)
+
     def test_only_admin_creates_category(self):
         """Test not admin can't create category"""
         payload = {"name": "sample category"}
@@ -95,3 +108,36 @@ class PrivateCategoryAPITests(TestCase):
         res = self.client.delete(url)
 
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_create_duplicate_category_error(self):
+        """Test category name is unique in case-insensitive manner"""
+        create_category("Shoes")
+        res = self.client.post(CATEGORY_LIST_URL, {"name": "SHOES"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data["name"], ["Category with this Name (SHOES) already exists!"]
+        )
+        self.assertEqual(Category.objects.count(), 1)
+
+    def test_update_category_with_unchanged_name(self):
+        """Test category can be saved again with its own name"""
+        category = create_category("Shoes")
+        url = get_detail_url(category.id)
+        res = self.client.put(url, {"name": "Shoes"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_bulk_create_categories(self):
+        """Test categories are imported with one insert and one select"""
+        existing = create_category("Shoes")
+        payload = {"names": ["shoes", "Hats", "Bags", "HATS"]}
+
+        with self.assertNumQueries(2):
+            res = self.client.post(CATEGORY_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        names = [category["name"] for category in res.data["categories"]]
+        self.assertEqual(names, ["Shoes", "Hats", "Bags"])
+        self.assertEqual(res.data["categories"][0]["id"], existing.id)
+        self.assertEqual(Category.objects.count(), 3)
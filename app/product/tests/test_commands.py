@@ -0,0 +1,137 @@
+import json
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from product.models import Category, Product
+from .test_models import create_category, create_product, create_review
+
+
+class RebuildProductRatingsTests(TestCase):
+    """Test rebuild_product_ratings command"""
+
+    def test_rebuild_drifted_counters(self):
+        """Test counters are recomputed from reviews"""
+        category = create_category()
+        product = create_product(category=category)
+        empty_product = create_product(category=category)
+        user1 = get_user_model().objects.create_user(email="test1@example.com")
+        user2 = get_user_model().objects.create_user(email="test2@example.com")
+        create_review(user1, product, rating=4)
+        create_review(user2, product, rating=1)
+
+        Product.objects.update(
+            review_count=10, rating_sum=3, rating=0.3, rating_2_count=7
+        )
+        call_command("rebuild_product_ratings")
+
+        product.refresh_from_db()
+        self.assertEqual(product.review_count, 2)
+        self.assertEqual(product.rating_sum, 5)
+        self.assertEqual(product.rating, 2.5)
+        self.assertEqual(product.rating_histogram, {1: 1, 2: 0, 3: 0, 4: 1, 5: 0})
+        empty_product.refresh_from_db()
+        self.assertEqual(empty_product.review_count, 0)
+        self.assertEqual(empty_product.rating, 0)
+
+
+class BenchmarkProductSearchTests(TestCase):
+    """Test benchmark_product_search command"""
+
+    def test_seeded_products_rolled_back(self):
+        """Test search is measured and seeded catalog is removed"""
+        out = StringIO()
+        call_command(
+            "benchmark_product_search", products=100, queries=["parka"], stdout=out
+        )
+
+        self.assertIn("'parka':", out.getvalue())
+        self.assertFalse(Product.objects.exists())
+
+
+class ImportProductsTests(TestCase):
+    """Test import_products command"""
+
+    def import_rows(self, content, suffix, *args):
+        with tempfile.NamedTemporaryFile("w", suffix=suffix) as file:
+            file.write(content)
+            file.flush()
+            out, err = StringIO(), StringIO()
+            call_command("import_products", file.name, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_csv(self):
+        """Test products are created by SKU with categories resolved by name"""
+        create_category("Jackets")
+        content = (
+            "sku,name,price,stock,category,brand,properties\n"
+            'J-1,Shell,120.50,3,jackets,Acme,"{""color"": ""black""}"\n'
+            "B-1,Boot,80,10,Boots,,\n"
+        )
+        out, err = self.import_rows(content, ".csv")
+
+        self.assertIn(
+            "Imported 2 products (2 created, 0 updated), 0 rows skipped!", out
+        )
+        self.assertEqual(Category.objects.count(), 2)
+        shell = Product.objects.get(sku="J-1")
+        self.assertEqual(shell.category.name, "Jackets")
+        self.assertEqual(shell.price, Decimal("120.50"))
+        self.assertEqual(shell.properties, {"color": "black"})
+        self.assertEqual(Product.objects.get(sku="B-1").category.name, "Boots")
+
+    def test_import_updates_existing_sku(self):
+        """Test product with the same SKU is updated instead of duplicated"""
+        category = create_category()
+        product = create_product(category, sku="S-1", name="old", stock=1)
+        row = {"sku": "S-1", "name": "new", "price": 50, "stock": 7}
+        row["category"] = category.name
+        self.import_rows(json.dumps(row), ".ndjson")
+
+        product.refresh_from_db()
+        self.assertEqual(Product.objects.count(), 1)
+        self.assertEqual(product.name, "new")
+        self.assertEqual(product.stock, 7)
+
+    def test_invalid_rows_reported(self):
+        """Test invalid rows are skipped while valid ones in batch are saved"""
+        rows = [
+            {"sku": "A", "name": "a", "price": 10, "stock": 1, "category": "c"},
+            {"sku": "A", "name": "a", "price": 10, "stock": 1, "category": "c"},
+            {"sku": "B", "name": "b", "price": 0, "stock": 1, "category": "c"},
+            {"sku": "C", "name": "c", "price": 10, "category": "c"},
+            {"sku": "D", "name": "d", "price": 10, "stock": -1, "category": "c"},
+        ]
+        content = "\n".join(json.dumps(row) for row in rows) + "\nnot json\n"
+        out, err = self.import_rows(content, ".ndjson", "--batch-size", "3")
+
+        self.assertIn(
+            "Imported 1 products (1 created, 0 updated), 5 rows skipped!", out
+        )
+        self.assertEqual(list(Product.objects.values_list("sku", flat=True)), ["A"])
+        self.assertIn("Row 2: {'sku': ['Repeats in batch.']}", err)
+        self.assertIn("Row 3: {'price'", err)
+        self.assertIn("Row 4: {'stock'", err)
+        self.assertIn("Row 5: {'stock'", err)
+        self.assertIn("Row 6: ['Row must be a JSON object.']", err)
+
+    def test_non_finite_properties_reported(self):
+        """Test NaN and Infinity in properties are errors of their rows"""
+        content = (
+            '{"sku": "A", "name": "a", "price": 10, "stock": 1, "category": "c"}\n'
+            '{"sku": "B", "name": "b", "price": 10, "stock": 1, "category": "c",'
+            ' "properties": {"size": NaN}}\n'
+        )
+        out, err = self.import_rows(content, ".ndjson", "--batch-size", "1")
+        self.assertIn("1 rows skipped!", out)
+        self.assertIn("Row 2: {'properties': ['NaN and Infinity", err)
+
+        content = (
+            "sku,name,price,stock,category,properties\n"
+            'C,c,10,1,c,"{""size"": [1, Infinity]}"\n'
+        )
+        out, err = self.import_rows(content, ".csv")
+        self.assertIn("Row 1: {'properties': ['NaN and Infinity", err)
+        self.assertEqual(list(Product.objects.values_list("sku", flat=True)), ["A"])
@@ -47,6 +47,12 @@ class CategoryModelTests(TestCase):
 
         self.assertEqual(str(category), category_name)
 
+    def test_create_category_duplicate_name_error(self):
+        """Test database rejects category names differing only in case"""
+        create_category("Shoes")
+        with self.assertRaises(IntegrityError):
+            create_category("sHoEs")
+
 
 class ProductModelTests(TestCase):
     """Test Product model"""
@@ -93,6 +99,76 @@ class ProductModelTests(TestCase):
 
         self.assertEqual(product.rating, 3)
 
+    def test_rating_counters_follow_reviews(self):
+        """Test rating counters are shifted on review create, update, delete"""
+        category = create_category()
+        product = create_product(category=category)
+        user1 = get_user_model().objects.create_user(email="test1@example.com")
+        user2 = get_user_model().objects.create_user(email="test2@example.com")
+
+        create_review(user1, product, rating=5)
+        review = create_review(user2, product, rating=2)
+        product.refresh_from_db()
+        self.assertEqual(product.review_count, 2)
+        self.assertEqual(product.rating_sum, 7)
+        self.assertEqual(product.rating, 3.5)
+
+        # Fetch review again to update it as API does
+        review = Review.objects.get(pk=review.pk)
+        review.rating = 4
+        review.save()
+        product.refresh_from_db()
+        self.assertEqual(product.rating_sum, 9)
+        self.assertEqual(product.rating, 4.5)
+        self.assertEqual(product.rating_histogram, {1: 0, 2: 0, 3: 0, 4: 1, 5: 1})
+
+        Review.objects.get(pk=review.pk).delete()
+        product.refresh_from_db()
+        self.assertEqual(product.review_count, 1)
+        self.assertEqual(product.rating, 5)
+
+        Review.objects.all().delete()
+        product.refresh_from_db()
+        self.assertEqual(product.review_count, 0)
+        self.assertEqual(product.rating, 0)
+
+    def test_deferred_review_rating_not_loaded(self):
+        """Test reviews loaded without rating don't query it one by one"""
+        product = create_product(category=create_category())
+        for i in range(3):
+            user = get_user_model().objects.create_user(email=f"test{i}@example.com")
+            create_review(user, product, rating=4)
+
+        with self.assertNumQueries(1):
+            reviews = list(Review.objects.only("id", "product", "commentary"))
+        with self.assertNumQueries(1):
+            reviews[0].commentary = "edited"
+            reviews[0].save(update_fields=["commentary"])
+
+        product.refresh_from_db()
+        self.assertEqual(product.review_count, 3)
+        self.assertEqual(product.rating_sum, 12)
+
+        reviews[1].delete()
+        product.refresh_from_db()
+        self.assertEqual(product.review_count, 2)
+        self.assertEqual(product.rating_sum, 8)
+
+    def test_deferred_review_rating_changed(self):
+        """Test new rating of review loaded without it shifts counters"""
+        product = create_product(category=create_category())
+        user = get_user_model().objects.create_user(email="test@example.com")
+        review = create_review(user, product, rating=4)
+
+        review = Review.objects.only("id").get(pk=review.pk)
+        review.rating = 2
+        review.save()
+
+        product.refresh_from_db()
+        self.assertEqual(product.review_count, 1)
+        self.assertEqual(product.rating_sum, 2)
+        self.assertEqual(product.rating_histogram, {1: 0, 2: 1, 3: 0, 4: 0, 5: 0})
+
 
 class ReviewModelTests(TestCase):
     """Test Review model"""
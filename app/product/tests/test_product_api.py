@@ -1,18 +1,37 @@
+import csv
+import io
+import json
 import os
 import tempfile
+from base64 import urlsafe_b64encode
+from datetime import timedelta
 from decimal import Decimal
+from unittest.mock import patch
 from PIL import Image
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.core.files import File
+from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework import status
 from rest_framework.test import APIClient
-from .test_models import create_category, create_product
+from .test_models import create_category, create_product, create_review
+from jobs.queue import work
 from product.models import Product
-from product.serializers import ProductSerializer, ProductDetailSerializer
+from product.views import autocomplete_cache
+from product.serializers import (
+    ProductDetailSerializer,
+    ProductImageSerializer,
+    ProductSerializer,
+)
 
 PRODUCT_LIST_URL = reverse("product:product-list")
+AUTOCOMPLETE_URL = reverse("product:product-autocomplete")
+FACETS_URL = reverse("product:product-facets")
+EXPORT_URL = reverse("product:product-export")
+IMPORT_URL = reverse("product:product-import")
 
 
 def get_product_detail_url(product_id):
@@ -20,6 +39,11 @@ def get_product_detail_url(product_id):
     return reverse("product:product-detail", kwargs={"pk": product_id})
 
 
+def get_stats_url(product_id):
+    """Get url of specific product review statistics"""
+    return reverse("product:product-stats", args=[product_id])
+
+
 def get_image_upload_url(product_id):
     """Get url to upload image to specific product"""
     return reverse("product:product-upload-image", args=[product_id])
@@ -30,6 +54,8 @@ class PublicProductAPITests(TestCase):
 
     def setUp(self):
         self.client = APIClient()
+        cache.clear()
+        autocomplete_cache.clear()
 
     def test_list_products(self):
         """Test listing products"""
@@ -54,6 +80,302 @@ class PublicProductAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, product_serializer.data)
 
+    def test_product_stats(self):
+        """Test getting rating histogram without aggregating reviews"""
+        category = create_category()
+        product = create_product(category=category)
+        for i, rating in enumerate([5, 5, 3]):
+            user = get_user_model().objects.create_user(f"test{i}@example.com")
+            create_review(user, product, rating=rating)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(get_stats_url(product.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["review_count"], 3)
+        self.assertAlmostEqual(res.data["rating"], 13 / 3)
+        self.assertEqual(
+            res.data["histogram"], {"1": 0, "2": 0, "3": 1, "4": 0, "5": 2}
+        )
+
+    def test_retrieve_product_with_stats(self):
+        """Test stats are included in product details only on request"""
+        category = create_category()
+        product = create_product(category=category)
+        user = get_user_model().objects.create_user("test@example.com")
+        create_review(user, product, rating=2)
+        url = get_product_detail_url(product.id)
+
+        res = self.client.get(url)
+        self.assertNotIn("stats", res.data)
+
+        res = self.client.get(url, {"include": "stats"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["stats"]["review_count"], 1)
+        self.assertEqual(res.data["stats"]["histogram"]["2"], 1)
+
+    def test_response_cached(self):
+        """Test repeated request is served from cache without queries"""
+        category = create_category()
+        create_product(category=category)
+        res = self.client.get(PRODUCT_LIST_URL)
+
+        with self.assertNumQueries(0):
+            cached_res = self.client.get(PRODUCT_LIST_URL)
+
+        self.assertEqual(cached_res.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached_res.data, res.data)
+
+    def test_cached_response_invalidated(self):
+        """Test product and review changes invalidate cached responses"""
+        category = create_category()
+        product = create_product(category=category, price=Decimal("10.00"))
+        url = get_product_detail_url(product.id)
+        self.client.get(url)
+
+        product.price = Decimal("20.00")
+        product.save()
+        res = self.client.get(url)
+        self.assertEqual(res.data["price"], "20.00")
+
+        user = get_user_model().objects.create_user("test@example.com")
+        create_review(user, product, rating=4)
+        res = self.client.get(url)
+        self.assertEqual(res.data["rating"], 4)
+
+        product.delete()
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_not_modified(self):
+        """Test conditional requests of unchanged product get 304"""
+        category = create_category()
+        product = create_product(category=category)
+        url = get_product_detail_url(product.id)
+        res = self.client.get(url)
+        etag, last_modified = res.headers["ETag"], res.headers["Last-Modified"]
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.headers["ETag"], etag)
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        product.price = Decimal("20.00")
+        product.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.headers["ETag"], etag)
+
+    def test_list_not_modified(self):
+        """Test list etag changes when product is added or deleted"""
+        category = create_category()
+        product = create_product(category=category)
+        res = self.client.get(PRODUCT_LIST_URL)
+        etag = res.headers["ETag"]
+        self.assertNotIn("Last-Modified", res.headers)
+
+        res = self.client.get(PRODUCT_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        product.delete()
+        res = self.client.get(PRODUCT_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"], [])
+
+    def test_search_products(self):
+        """Test search matches stemmed words and ranks name matches first"""
+        category = create_category()
+        p1 = create_product(category, name="Jacket", description="Running shoes")
+        p2 = create_product(category, name="Running shoes", brand="Sportex")
+        create_product(category, name="Hat", description="Warm wool hat")
+
+        res = self.client.get(PRODUCT_LIST_URL, {"q": "run shoe"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [product["id"] for product in res.data["results"]]
+        self.assertEqual(ids, [p2.id, p1.id])
+
+    def test_search_vector_updated_on_save(self):
+        """Test renamed product is found by its new name"""
+        category = create_category()
+        product = create_product(category, name="Jacket")
+        product.name = "Parka"
+        product.save()
+
+        res = self.client.get(PRODUCT_LIST_URL, {"q": "parka"})
+        self.assertEqual(res.data["results"], [ProductSerializer(product).data])
+        res = self.client.get(PRODUCT_LIST_URL, {"q": "jacket"})
+        self.assertEqual(res.data["results"], [])
+
+    def test_search_with_category_and_ordering(self):
+        """Test search is combined with category filter and ordering"""
+        c1 = create_category("c1")
+        c2 = create_category("c2")
+        p1 = create_product(c1, name="Black jacket", price=Decimal("200"))
+        p2 = create_product(c1, name="Jacket", price=Decimal("100"))
+        create_product(c2, name="Jacket")
+        create_product(c1, name="Hat")
+
+        params = {"q": "jacket", "category__in": c1.id, "ordering": "price"}
+        res = self.client.get(PRODUCT_LIST_URL, params)
+        ids = [product["id"] for product in res.data["results"]]
+        self.assertEqual(ids, [p2.id, p1.id])
+
+        params = {"q": "jacket", "category__in": c1.id, "cursor": "", "limit": 1}
+        res = self.client.get(PRODUCT_LIST_URL, params)
+        ids = [product["id"] for product in res.data["results"]]
+        res = self.client.get(res.data["next"])
+        ids += [product["id"] for product in res.data["results"]]
+        self.assertEqual(sorted(ids), [p1.id, p2.id])
+        self.assertIsNone(res.data["next"])
+
+    def test_autocomplete(self):
+        """Test prefix matches go before typo tolerant similar ones"""
+        category = create_category()
+        similar = create_product(category, name="Black jacket", brand="Noir")
+        prefix = create_product(category, name="Jacketwear parka", brand="Noir")
+        brand = create_product(category, name="Vest", brand="Jackal")
+        create_product(category, name="Hat", brand="Noir")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "jac"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {product["id"] for product in res.data[:2]}, {prefix.id, brand.id}
+        )
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "jaket"})
+        self.assertEqual(
+            res.data[0], {"id": similar.id, "name": "Black jacket", "brand": "Noir"}
+        )
+        self.assertNotIn("Hat", [product["name"] for product in res.data])
+
+    def test_autocomplete_limit(self):
+        """Test number of suggestions is limited"""
+        category = create_category()
+        for i in range(5):
+            create_product(category, name=f"Parka {i}")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "park", "limit": 2})
+        self.assertEqual(len(res.data), 2)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "park", "limit": 1000})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(AUTOCOMPLETE_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_cached_in_memory(self):
+        """Test repeated prefix is answered without queries until change"""
+        category = create_category()
+        create_product(category, name="Parka")
+        self.client.get(AUTOCOMPLETE_URL, {"q": "Par"})
+
+        with self.assertNumQueries(0):
+            res = self.client.get(AUTOCOMPLETE_URL, {"q": "par"})
+        self.assertEqual(len(res.data), 1)
+
+        create_product(category, name="Parka 2")
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "par"})
+        self.assertEqual(len(res.data), 2)
+
+    def test_filter_by_properties(self):
+        """Test values of one key are combined with OR and keys with AND"""
+        category = create_category()
+        black_m = create_product(category, properties={"color": "black", "size": "M"})
+        black_l = create_product(category, properties={"color": "black", "size": "L"})
+        create_product(category, properties={"color": "black", "size": "S"})
+        create_product(category, properties={"color": "white", "size": "M"})
+        create_product(category)
+
+        params = {"prop.color": "black", "prop.size": "M,L"}
+        res = self.client.get(PRODUCT_LIST_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [product["id"] for product in res.data["results"]]
+        self.assertEqual(ids, [black_m.id, black_l.id])
+
+    def test_property_facets(self):
+        """Test facet counts follow the current filters"""
+        c1 = create_category("c1")
+        c2 = create_category("c2")
+        create_product(c1, properties={"color": "black", "size": "M"})
+        create_product(c1, properties={"color": "black", "size": "L"})
+        create_product(c1, properties={"color": "white", "size": "M", "tags": []})
+        create_product(c1, properties={"color": "black", "waterproof": True})
+        create_product(c2, properties={"color": "red"})
+
+        res = self.client.get(FACETS_URL, {"category__in": c1.id})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            {
+                "color": {"black": 3, "white": 1},
+                "size": {"M": 2, "L": 1},
+                "waterproof": {"true": 1},
+            },
+        )
+
+        params = {"category__in": c1.id, "prop.size": "M"}
+        res = self.client.get(FACETS_URL, params)
+        self.assertEqual(res.data["color"], {"black": 1, "white": 1})
+
+    def test_filter_by_typed_facet_values(self):
+        """Test boolean and number facet values can be used as filters"""
+        category = create_category()
+        light = create_product(category, properties={"waterproof": True, "weight": 300})
+        heavy = create_product(
+            category, properties={"waterproof": False, "weight": 900}
+        )
+        text = create_product(category, properties={"waterproof": "true"})
+
+        res = self.client.get(FACETS_URL)
+        self.assertEqual(res.data["waterproof"], {"true": 2, "false": 1})
+        self.assertEqual(res.data["weight"], {"300": 1, "900": 1})
+
+        res = self.client.get(PRODUCT_LIST_URL, {"prop.waterproof": "true"})
+        ids = {product["id"] for product in res.data["results"]}
+        self.assertEqual(ids, {light.id, text.id})
+
+        res = self.client.get(PRODUCT_LIST_URL, {"prop.weight": "900,abc"})
+        ids = [product["id"] for product in res.data["results"]]
+        self.assertEqual(ids, [heavy.id])
+
+    def test_filter_by_non_finite_facet_values(self):
+        """Test NaN and Infinity values are matched as text only"""
+        category = create_category()
+        create_product(category, properties={"size": 10})
+        text = create_product(category, properties={"size": "NaN"})
+
+        for value in ["NaN", "Infinity", "-Infinity", "1e400"]:
+            res = self.client.get(PRODUCT_LIST_URL, {"prop.size": value})
+            self.assertEqual(res.status_code, status.HTTP_200_OK, value)
+            ids = [product["id"] for product in res.data["results"]]
+            self.assertEqual(ids, [text.id] if value == "NaN" else [], value)
+
+    def test_filter_by_ranges(self):
+        """Test price, stock and creation date range filters"""
+        category = create_category()
+        cheap = create_product(category, price=Decimal("10"))
+        mid = create_product(category, price=Decimal("50"))
+        create_product(category, price=Decimal("50"), stock=0)
+        create_product(category, price=Decimal("100"))
+        Product.objects.filter(pk=cheap.pk).update(
+            created_at=timezone.now() - timedelta(days=30)
+        )
+
+        params = {"price__gte": "20", "price__lte": "50", "in_stock": "true"}
+        res = self.client.get(PRODUCT_LIST_URL, params)
+        ids = [product["id"] for product in res.data["results"]]
+        self.assertEqual(ids, [mid.id])
+
+        week_ago = (timezone.now() - timedelta(days=7)).isoformat()
+        res = self.client.get(PRODUCT_LIST_URL, {"created_at__lte": week_ago})
+        ids = [product["id"] for product in res.data["results"]]
+        self.assertEqual(ids, [cheap.id])
+
+        res = self.client.get(PRODUCT_LIST_URL, {"price__gte": "abc"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_filter_by_category(self):
         """Test filtering products by category"""
         c1 = create_category("c1")
@@ -127,7 +449,104 @@ class PublicProductAPITests(TestCase):
 
     def test_pagination(self):
         """Test paginating products"""
-        pass
+        category = create_category()
+        for _ in range(3):
+            create_product(category=category)
+
+        res = self.client.get(PRODUCT_LIST_URL, {"limit": 2, "offset": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 3)
+        products = Product.objects.all().order_by("id")[2:]
+        serializer = ProductSerializer(products, many=True)
+        self.assertEqual(res.data["results"], serializer.data)
+
+    def test_exact_count_cached(self):
+        """Test exact count of small list is cached per filter combination"""
+        c1 = create_category("c1")
+        c2 = create_category("c2")
+        create_product(c1)
+
+        res = self.client.get(PRODUCT_LIST_URL, {"category__in": c1.id})
+        self.assertEqual(res.data["count"], 1)
+        self.assertFalse(res.data["count_estimated"])
+
+        create_product(c1)
+        create_product(c2)
+        # Same filters get count from cache while other ones count again.
+        # Only validators, category filter validation and page queries are run
+        with self.assertNumQueries(4):
+            res = self.client.get(
+                PRODUCT_LIST_URL, {"category__in": c1.id, "offset": 1}
+            )
+        self.assertEqual(res.data["count"], 1)
+        res = self.client.get(PRODUCT_LIST_URL, {"category__in": c2.id})
+        self.assertEqual(res.data["count"], 1)
+
+    @override_settings(PAGINATION_ESTIMATE_THRESHOLD=0)
+    def test_estimated_count(self):
+        """Test big list gets planner estimated count"""
+        category = create_category()
+        create_product(category=category)
+
+        res = self.client.get(PRODUCT_LIST_URL, {"category__in": category.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data["count_estimated"])
+        self.assertIsInstance(res.data["count"], int)
+
+    def test_keyset_pagination(self):
+        """Test walking products pages by cursor with ties in ordering"""
+        category = create_category()
+        for price in [300, 100, 200, 100, 300]:
+            create_product(category=category, price=Decimal(price))
+
+        res = self.client.get(
+            PRODUCT_LIST_URL, {"cursor": "", "limit": 2, "ordering": "-price"}
+        )
+        results = res.data["results"]
+        self.assertNotIn("count", res.data)
+        self.assertIsNone(res.data["previous"])
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            results += res.data["results"]
+
+        products = Product.objects.all().order_by("-price", "-id")
+        serializer = ProductSerializer(products, many=True)
+        self.assertEqual(results, serializer.data)
+
+        # Walk back from the last page to the previous one
+        res = self.client.get(res.data["previous"])
+        self.assertEqual(res.data["results"], serializer.data[2:4])
+
+    def test_keyset_pagination_invalid_cursor(self):
+        """Test malformed cursor returns error"""
+        res = self.client.get(PRODUCT_LIST_URL, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_keyset_pagination_mistyped_cursor(self):
+        """Test well-formed cursor of values not matching ordering fields"""
+        create_product(category=create_category())
+        cursors = [{"v": ["cheap", 1]}, {"v": ["10.00", "x"]}, {"v": [[1], 1]}]
+
+        for cursor in cursors:
+            encoded = urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+            res = self.client.get(
+                PRODUCT_LIST_URL, {"cursor": encoded, "ordering": "price"}
+            )
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND, cursor)
+
+        cursor = urlsafe_b64encode(b'{"v": ["10.00", "1"]}').decode()
+        res = self.client.get(PRODUCT_LIST_URL, {"cursor": cursor, "ordering": "price"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_export_admin_only(self):
+        """Test catalog export isn't available to unauthenticated user"""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
     def test_no_admin_permission_error(self):
         """Test only admin can create or edit products"""
@@ -217,6 +636,119 @@ class PrivateProductAPITests(TestCase):
         for k, v in payload.items():
             self.assertNotEqual(getattr(product, k), v)
 
+    def test_export_ndjson(self):
+        """Test filtered products are streamed one JSON object per line"""
+        category = create_category("Jackets")
+        p1 = create_product(category, properties={"color": "black"})
+        create_product(category, price=Decimal("5"))
+        p3 = create_product(category)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(EXPORT_URL, {"price__gte": "50"})
+            content = b"".join(res.streaming_content).decode()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row["id"] for row in rows], [p1.id, p3.id])
+        self.assertEqual(rows[0]["category_name"], "Jackets")
+        self.assertEqual(rows[0]["properties"], {"color": "black"})
+        self.assertEqual(rows[0]["price"], "100.99")
+
+    def test_export_csv_updated_since(self):
+        """Test only products changed since given time are exported to CSV"""
+        category = create_category()
+        old = create_product(category)
+        recent = create_product(category, name="recent", properties={"size": "M"})
+        Product.objects.filter(pk=old.pk).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+
+        params = {
+            "file_format": "csv",
+            "updated_since": (timezone.now() - timedelta(days=1)).isoformat(),
+        }
+        res = self.client.get(EXPORT_URL, params)
+        content = b"".join(res.streaming_content).decode()
+
+        self.assertEqual(res["Content-Type"], "text/csv")
+        self.assertIn("products.csv", res["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], str(recent.id))
+        self.assertEqual(rows[0]["name"], "recent")
+        self.assertEqual(json.loads(rows[0]["properties"]), {"size": "M"})
+
+    def test_export_invalid_params(self):
+        """Test invalid format and filters are rejected before streaming"""
+        res = self.client.get(EXPORT_URL, {"file_format": "xml"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(EXPORT_URL, {"updated_since": "yesterday"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_products(self):
+        """Test uploaded rows are upserted by SKU and invalid ones reported"""
+        category = create_category("Jackets")
+        product = create_product(category, sku="J-1")
+        rows = [
+            {"sku": "J-1", "name": "new", "price": 10, "stock": 1},
+            {"sku": "J-2", "name": "x", "price": "abc", "stock": 1},
+        ]
+        for row in rows:
+            row["category"] = "jackets"
+        content = "\n".join(json.dumps(row) for row in rows).encode()
+        upload = SimpleUploadedFile("products.ndjson", content)
+
+        res = self.client.post(IMPORT_URL, {"file": upload}, format="multipart")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["imported"], 1)
+        self.assertEqual([error["row"] for error in res.data["errors"]], [2])
+        self.assertIn("price", res.data["errors"][0]["errors"])
+        product.refresh_from_db()
+        self.assertEqual(product.name, "new")
+        self.assertEqual(Product.objects.count(), 1)
+
+    @override_settings(PRODUCT_IMPORT_BATCH_SIZE=1)
+    def test_import_undecodable_row_reported(self):
+        """Test row of invalid UTF-8 is reported with counts of saved ones"""
+        rows = [
+            b'{"sku": "A", "name": "a", "price": 10, "stock": 1, "category": "c"}',
+            b'{"sku": "B", "name": "\xff", "price": 10, "stock": 1, "category": "c"}',
+            b'{"sku": "C", "name": "c", "price": 10, "stock": 1, "category": "c"}',
+        ]
+        upload = SimpleUploadedFile("products.ndjson", b"\n".join(rows))
+
+        res = self.client.post(IMPORT_URL, {"file": upload}, format="multipart")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["created"], 2)
+        self.assertEqual(res.data["updated"], 0)
+        self.assertEqual(
+            res.data["errors"],
+            [{"row": 2, "errors": {"name": ["Must be UTF-8 encoded text."]}}],
+        )
+        self.assertEqual(
+            sorted(Product.objects.values_list("sku", flat=True)), ["A", "C"]
+        )
+
+    def test_import_category_lowered_by_database(self):
+        """Test categories whose lower case differs in Python and database"""
+        rows = [
+            {"sku": "A", "name": "a", "price": 10, "stock": 1, "category": "İstanbul"},
+            {"sku": "B", "name": "b", "price": 10, "stock": 1, "category": "Äpfel"},
+        ]
+        content = "\n".join(json.dumps(row) for row in rows).encode()
+        upload = SimpleUploadedFile("products.ndjson", content)
+
+        res = self.client.post(IMPORT_URL, {"file": upload}, format="multipart")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["created"], 2)
+        self.assertEqual(Product.objects.get(sku="A").category.name, "İstanbul")
+        self.assertEqual(Product.objects.get(sku="B").category.name, "Äpfel")
+
     def test_delete_product(self):
         """Test product deletion"""
         category = create_category()
@@ -245,6 +777,40 @@ class PrivateProductAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIn("image", res.data)
         self.assertTrue(os.path.exists(product.image.path))
+        # Resized copies are made by queued job
+        self.assertEqual(res.data["image_status"], "pending")
+        self.assertIsNone(res.data["image_srcset"])
+
+        self.assertEqual(work(burst=True), 1)
+        product.refresh_from_db()
+        self.assertEqual(
+            product.image_widths, {"thumbnail": 10, "card": 10, "detail": 10}
+        )
+        card_path = os.path.splitext(product.image.path)[0] + "_card.jpg"
+        self.assertTrue(os.path.exists(card_path))
+        res = self.client.get(get_product_detail_url(product.id))
+        self.assertIn("_thumbnail.webp 10w", res.data["image_srcset"]["webp"])
+
+    @override_settings(JOB_MAX_ATTEMPTS=1)
+    def test_upload_product_image_derivatives_failed(self):
+        """Test image status once job making resized copies gave up"""
+        product = create_product(category=create_category())
+        image_file = io.BytesIO()
+        Image.new("RGB", (10, 10)).save(image_file, "JPEG")
+        image_file.name = "image.jpg"
+        image_file.seek(0)
+        url = get_image_upload_url(product.id)
+        self.client.post(url, {"image": image_file}, format="multipart")
+
+        with patch("core.images.generate_derivatives", side_effect=OSError):
+            with self.assertLogs("jobs.queue", "ERROR"):
+                self.assertEqual(work(burst=True), 1)
+
+        product.refresh_from_db()
+        self.assertIsNone(product.image_widths)
+        data = ProductImageSerializer(product).data
+        self.assertEqual(data["image_status"], "failed")
+        self.assertIsNone(data["image_srcset"])
 
     def test_upload_product_image_bad_request(self):
         """Test invalid payload"""
@@ -257,6 +823,34 @@ class PrivateProductAPITests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @override_settings(IMAGE_UPLOAD_MAX_DIMENSIONS=(100, 100))
+    def test_upload_product_image_too_large_dimensions(self):
+        """Test image over max dimensions is rejected"""
+        product = create_product(category=create_category())
+        image_file = io.BytesIO()
+        Image.new("RGB", (200, 10)).save(image_file, "JPEG")
+        image_file.name = "wide.jpg"
+        image_file.seek(0)
+
+        url = get_image_upload_url(product.id)
+        res = self.client.post(url, {"image": image_file}, format="multipart")
+
+        product.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("dimensions", res.data["image"][0])
+        self.assertFalse(product.image)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=100, DATA_UPLOAD_MAX_MEMORY_SIZE=100)
+    def test_upload_product_image_request_too_large(self):
+        """Test body which can't fit allowed image is rejected unread"""
+        product = create_product(category=create_category())
+        payload = {"image": SimpleUploadedFile("big.jpg", b"\x00" * 1000)}
+
+        url = get_image_upload_url(product.id)
+        res = self.client.post(url, payload, format="multipart")
+
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
     def test_clear_product_image(self):
         """Test removing product image"""
 
@@ -279,6 +873,7 @@ class PrivateProductAPITests(TestCase):
 
         product.refresh_from_db()
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data["image_srcset"])
         # Ensure there is no more image path
         with self.assertRaises(ValueError):
             os.path.exists(product.image.path)
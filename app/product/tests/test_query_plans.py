@@ -0,0 +1,81 @@
+from django.db import connection
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from product.views import ProductViewSet
+from product.models import Product
+from .test_models import create_category, create_product
+
+
+def explain_product_list(params):
+    """Get plan of the products page query built by the list view"""
+    request = Request(APIRequestFactory().get("/", params))
+    view = ProductViewSet(request=request, action="list", format_kwarg=None)
+    queryset = view.filter_queryset(view.get_queryset())[:100]
+    sql, sql_params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        # Table is small, make planner show the plan it would pick for
+        # a big one. Without a suitable index it still has to scan or sort
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("SET LOCAL enable_sort = off")
+        cursor.execute(f"EXPLAIN {sql}", sql_params)
+        return "\n".join(row[0] for row in cursor.fetchall())
+
+
+class ProductQueryPlanTests(TestCase):
+    """Test common product list filters and ordering are index backed"""
+
+    def setUp(self):
+        self.category = create_category()
+        create_product(self.category)
+        # Products of other categories make the category filter selective,
+        # statistics left by earlier tests could favour any index otherwise
+        categories = [create_category(f"category {i}") for i in range(20)]
+        Product.objects.bulk_create(
+            Product(
+                category=categories[i % len(categories)],
+                name="other",
+                price=i,
+                stock=1,
+            )
+            for i in range(1000)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE product_product")
+
+    # Index should serve both filters and ordering
+    def assert_uses_index(self, params, index_name):
+        plan = explain_product_list(params)
+        self.assertNotIn("Seq Scan", plan)
+        self.assertNotIn("Sort", plan)
+        self.assertIn(index_name, plan)
+
+    def test_category_and_price_range_ordered_by_price(self):
+        params = {
+            "category__in": self.category.id,
+            "price__gte": "10",
+            "price__lte": "100",
+            "in_stock": "true",
+            "ordering": "price",
+        }
+        self.assert_uses_index(params, "product_category_price_idx")
+
+    def test_category_ordered_by_price(self):
+        params = {"category__in": self.category.id, "ordering": "-price"}
+        self.assert_uses_index(params, "product_category_price_idx")
+
+    def test_category_new_items(self):
+        params = {
+            "category__in": self.category.id,
+            "created_at__gte": "2024-01-01T00:00:00Z",
+            "ordering": "-created_at",
+        }
+        self.assert_uses_index(params, "product_category_created_idx")
+
+    def test_price_range_ordered_by_price(self):
+        params = {"price__gte": "10", "price__lte": "100", "ordering": "price"}
+        self.assert_uses_index(params, "product_price_id_idx")
+
+    def test_new_items(self):
+        params = {"created_at__gte": "2024-01-01T00:00:00Z", "ordering": "-created_at"}
+        self.assert_uses_index(params, "product_created_id_idx")
@@ -51,6 +51,22 @@ class PublicReviewAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, review_serializer.data)
 
+    def test_list_not_modified(self):
+        """Test unchanged review list gets 304 without serializing reviews"""
+        category = create_category()
+        product = create_product(category)
+        create_review(self.user1, product)
+        res = self.client.get(REVIEW_LIST_URL, {"product": product.id})
+
+        # Only product filter validation and validators queries
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                REVIEW_LIST_URL,
+                {"product": product.id},
+                HTTP_IF_NONE_MATCH=res.headers["ETag"],
+            )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
     def test_filter_reviews_by_product(self):
         """Test filtering reviews by product"""
         category = create_category()
@@ -116,6 +132,26 @@ class PublicReviewAPITests(TestCase):
         serializer = ReviewSerializer(reviews, many=True)
         self.assertEqual(res.data["results"], serializer.data)
 
+    def test_keyset_pagination_by_date(self):
+        """Test walking reviews pages by cursor ordered by date"""
+        category = create_category()
+        product = create_product(category)
+        for i in range(3):
+            user = get_user_model().objects.create_user(email=f"u{i}@example.com")
+            create_review(user, product)
+
+        query_params = {"cursor": "", "limit": 2, "ordering": "-created_at"}
+        res = self.client.get(REVIEW_LIST_URL, query_params)
+        results = res.data["results"]
+        res = self.client.get(res.data["next"])
+        results += res.data["results"]
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data["next"])
+        reviews = Review.objects.all().order_by("-created_at", "-id")
+        serializer = ReviewSerializer(reviews, many=True)
+        self.assertEqual(results, serializer.data)
+
     def test_auth_required_error(self):
         """Test auth is required to create or edit reviews"""
         category = create_category()
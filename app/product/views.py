@@ -1,3 +1,7 @@
+import csv
+import json
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import filters
 from rest_framework import viewsets
@@ -5,8 +9,9 @@ from rest_framework import mixins
 from rest_framework import permissions
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.parsers import FormParser, JSONParser
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -14,24 +19,63 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 from django_filters.rest_framework import DjangoFilterBackend
+from core.cache import (
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    LRUCache,
+    get_model_versions,
+)
+from core.pagination import KeysetOrLimitOffsetPagination
+from core.uploads import ImageUploadParser
+from authentication.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+from .filters import ProductFilter
+from .imports import ProductImporter, open_text, read_rows
 from .serializers import (
+    CategoryBulkSerializer,
     CategorySerializer,
+    ProductAutocompleteSerializer,
+    ProductAutocompleteQuerySerializer,
     ProductDetailSerializer,
+    ProductExportSerializer,
+    ProductExportQuerySerializer,
+    ProductImportSerializer,
     ProductSerializer,
     ProductImageSerializer,
+    ProductStatsSerializer,
     ReviewSerializer,
 )
 from .models import Category, Product, Review
 
+# Content type and file extension of export formats
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+
+# Suggestions for recent autocomplete prefixes, keyed with product version
+autocomplete_cache = LRUCache(settings.PRODUCT_AUTOCOMPLETE_CACHE_SIZE)
+
 
-class BaseViewSet(viewsets.ModelViewSet):
+class EchoBuffer:
+    """File-like object returning written value instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+class BaseViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """Basic attributes for category and products"""
 
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SignedTokenAuthentication]
+    # Actions available for everyone
+    public_actions = ["list", "retrieve"]
 
     # Permis only admins to create and edit
     def get_permissions(self):
-        if self.action not in ["list", "retrieve"]:
+        if self.action not in self.public_actions:
             return [permissions.IsAdminUser()]
         return super().get_permissions()
 
@@ -41,32 +85,117 @@ class CategoryViewSet(BaseViewSet):
 
     serializer_class = CategorySerializer
     queryset = Category.objects.all().order_by("id")
+    cache_models = [Category]
+
+    def get_serializer_class(self):
+        if self.action == "bulk":
+            return CategoryBulkSerializer
+        return super().get_serializer_class()
+
+    # Import many categories at once, existing names are returned as is
+    @action(["post"], detail=False)
+    def bulk(self, request):
+        """Get or create categories by names"""
+        bulk_serializer = self.get_serializer(data=request.data)
+        bulk_serializer.is_valid(raise_exception=True)
+        bulk_serializer.save()
+        return Response(bulk_serializer.data, status.HTTP_201_CREATED)
 
 
 @extend_schema_view(
     list=extend_schema(
+        description=(
+            "List products. Filter by properties with "
+            "`prop.<key>=<value>[,<value>...]` query params, "
+            "e.g. `?prop.color=black&prop.size=M,L`"
+        ),
         parameters=[
             OpenApiParameter(
                 name="category__in",
                 type=OpenApiTypes.STR,
                 description="Comma separated list of category IDs to filter by",
             ),
+            OpenApiParameter(
+                name="q",
+                type=OpenApiTypes.STR,
+                description="Search in name, brand and description. Results are ordered by relevance unless `ordering` is passed",
+            ),
             OpenApiParameter(
                 "ordering",
                 OpenApiTypes.STR,
-                description="Comma separated list of fields to order by: `price`, `rating`",
+                description="Comma separated list of fields to order by: `price`, `rating`, `created_at`",
+            ),
+        ],
+    ),
+    facets=extend_schema(
+        description=(
+            "Count products per value of each property. Accepts the same "
+            "filters as the list, including `prop.<key>` params"
+        ),
+        responses={
+            200: {
+                "type": "object",
+                "additionalProperties": {
+                    "type": "object",
+                    "additionalProperties": {"type": "integer"},
+                },
+            }
+        },
+    ),
+    autocomplete=extend_schema(
+        parameters=[ProductAutocompleteQuerySerializer],
+        responses=ProductAutocompleteSerializer(many=True),
+    ),
+    export=extend_schema(
+        description=(
+            "Stream the whole catalog as NDJSON or CSV. Accepts the same "
+            "filters as the list, pass `updated_since` for incremental feeds"
+        ),
+        parameters=[ProductExportQuerySerializer],
+        responses={
+            (200, "application/x-ndjson"): OpenApiTypes.STR,
+            (200, "text/csv"): OpenApiTypes.STR,
+        },
+    ),
+    import_products=extend_schema(
+        description=(
+            "Create or update products by `sku` from CSV or NDJSON file with "
+            "`sku`, `name`, `price`, `stock`, `category` (name), `description`, "
+            "`brand` and `properties` columns. Invalid rows are skipped and "
+            "reported with their 1-based numbers"
+        ),
+        responses={
+            200: {
+                "type": "object",
+                "properties": {
+                    "imported": {"type": "integer"},
+                    "errors": {"type": "array", "items": {"type": "object"}},
+                },
+            }
+        },
+    ),
+    retrieve=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "include",
+                OpenApiTypes.STR,
+                description="Pass `stats` to include rating histogram and review count",
             ),
         ]
-    )
+    ),
 )
 class ProductViewSet(BaseViewSet):
     """Manage products"""
 
     serializer_class = ProductDetailSerializer
     queryset = Product.objects.all().order_by("id")
+    pagination_class = KeysetOrLimitOffsetPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = {"category": ["in"]}
-    ordering_fields = ["price", "rating"]
+    filterset_class = ProductFilter
+    ordering_fields = ["price", "rating", "created_at"]
+    public_actions = BaseViewSet.public_actions + ["stats", "autocomplete", "facets"]
+    cached_actions = BaseViewSet.cached_actions + ["facets"]
+    cache_models = [Product]
 
     # Manually implemented filtering, ordering features
     # def get_queryset(self):
@@ -92,10 +221,106 @@ class ProductViewSet(BaseViewSet):
             return ProductSerializer
         elif self.action == "upload_image":
             return ProductImageSerializer
+        elif self.action == "stats":
+            return ProductStatsSerializer
+        elif self.action == "autocomplete":
+            return ProductAutocompleteSerializer
+        elif self.action == "export":
+            return ProductExportSerializer
+        elif self.action == "import_products":
+            return ProductImportSerializer
         return super().get_serializer_class()
 
-    # Custom action to update specific product's image field
-    @action(["post"], detail=True, url_name="upload-image")
+    # Facet counts are aggregated in database over the filtered products
+    @action(["get"], detail=False, pagination_class=None)
+    def facets(self, request):
+        """Count filtered products per value of each property"""
+        products = self.filter_queryset(self.get_queryset())
+        return Response(products.property_facets(), status.HTTP_200_OK)
+
+    # Search-as-you-type is answered from memory for repeated prefixes
+    @action(["get"], detail=False, pagination_class=None)
+    def autocomplete(self, request):
+        """Suggest products by name or brand prefix, tolerating typos"""
+        query_serializer = ProductAutocompleteQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        term = " ".join(query_serializer.validated_data["q"].split())
+        limit = query_serializer.validated_data["limit"]
+
+        version = get_model_versions([Product])[0]
+        cache_key = (term.lower(), limit, version)
+        suggestions = autocomplete_cache.get(cache_key)
+        if suggestions is None:
+            products = self.get_queryset().autocomplete(term)[:limit]
+            suggestions = list(self.get_serializer(products, many=True).data)
+            autocomplete_cache.set(cache_key, suggestions)
+        return Response(suggestions, status.HTTP_200_OK)
+
+    # Rows are read from server-side cursor in chunks and written as they
+    # come, so memory doesn't grow with catalog size
+    @action(["get"], detail=False, pagination_class=None)
+    def export(self, request):
+        """Stream filtered products as NDJSON or CSV"""
+        query_serializer = ProductExportQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        file_format = query_serializer.validated_data["file_format"]
+
+        products = self.filter_queryset(self.get_queryset()).select_related("category")
+        rows = products.iterator(chunk_size=settings.PRODUCT_EXPORT_CHUNK_SIZE)
+        serializer = self.get_serializer()
+        if file_format == "csv":
+            content = self.stream_csv(serializer, rows)
+        else:
+            content = self.stream_ndjson(serializer, rows)
+
+        content_type, extension = EXPORT_FORMATS[file_format]
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="products.{extension}"'
+        return response
+
+    def stream_ndjson(self, serializer, products):
+        for product in products:
+            data = serializer.to_representation(product)
+            yield json.dumps(data, cls=JSONEncoder, ensure_ascii=False) + "\n"
+
+    def stream_csv(self, serializer, products):
+        # Writer returns the line written to the buffer, nothing is kept
+        writer = csv.writer(EchoBuffer())
+        fields = list(serializer.fields)
+        yield writer.writerow(fields)
+        for product in products:
+            data = serializer.to_representation(product)
+            data["properties"] = json.dumps(data["properties"], ensure_ascii=False)
+            yield writer.writerow([data[field] for field in fields])
+
+    # Rows are read from uploaded file as they are validated and upserted
+    @action(["post"], detail=False, url_path="import", url_name="import")
+    def import_products(self, request):
+        """Upsert products by SKU from CSV or NDJSON file"""
+        import_serializer = self.get_serializer(data=request.data)
+        import_serializer.is_valid(raise_exception=True)
+        file = import_serializer.validated_data["file"]
+        file_format = import_serializer.validated_data["file_format"]
+
+        # Rows with undecodable bytes are reported along with saved ones
+        report = ProductImporter().run(read_rows(open_text(file), file_format))
+        return Response(report, status.HTTP_200_OK)
+
+    # Review statistics are kept in product counters so it costs 1 query
+    @action(["get"], detail=True)
+    def stats(self, request, pk):
+        """Get product rating histogram and review count"""
+        product_serializer = self.get_serializer(self.get_object())
+        return Response(product_serializer.data, status.HTTP_200_OK)
+
+    # Custom action to update specific product's image field, the image is
+    # checked while received instead of spooled to a temporary file
+    @action(
+        ["post"],
+        detail=True,
+        url_name="upload-image",
+        parser_classes=[JSONParser, FormParser, ImageUploadParser],
+    )
     def upload_image(self, request, pk):
         """Upload image to specific product"""
         product = self.get_object()
@@ -129,12 +354,13 @@ class ProductViewSet(BaseViewSet):
         ]
     )
 )
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Manage reviews"""
 
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SignedTokenAuthentication]
     serializer_class = ReviewSerializer
     queryset = Review.objects.all().order_by("id")
+    pagination_class = KeysetOrLimitOffsetPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ["product", "user"]
     ordering_fields = ["created_at", "rating"]
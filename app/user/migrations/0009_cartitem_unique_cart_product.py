@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:04
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_cartitems(apps, schema_editor):
+    """Merge cart items left by concurrent adds before adding constraint"""
+    CartItem = apps.get_model("user", "CartItem")
+    duplicates = (
+        CartItem.objects.values("cart", "product")
+        .annotate(first_id=Min("id"), total=Sum("quantity"), items=Count("id"))
+        .filter(items__gt=1)
+    )
+    for duplicate in duplicates:
+        same_items = CartItem.objects.filter(
+            cart=duplicate["cart"],
+            product=duplicate["product"],
+        )
+        same_items.exclude(pk=duplicate["first_id"]).delete()
+        same_items.update(quantity=duplicate["total"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0008_wishitem_wishitem_unique_user_product'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cartitems, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='unique_cart_product'),
+        ),
+    ]
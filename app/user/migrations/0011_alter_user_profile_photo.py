@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:51
+
+import core.files
+from django.db import migrations
+import user.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0010_user_profile_photo_widths"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="profile_photo",
+            field=core.files.ContentAddressedImageField(
+                blank=True, null=True, upload_to=user.models.generate_user_image_path
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0011_alter_user_profile_photo"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="profile_photo_widths",
+            field=models.JSONField(blank=True, default=dict, editable=False, null=True),
+        ),
+    ]
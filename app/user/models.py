@@ -1,6 +1,11 @@
 import os
+from decimal import Decimal
 from uuid import uuid4
-from django.db import models
+from django.db import connections, models
+from core.files import ContentAddressedImageField
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.contrib.postgres.aggregates import ArrayAgg
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -64,11 +69,16 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=100, blank=True)
     surname = models.CharField(max_length=100, blank=True)
     is_staff = models.BooleanField(default=False)
-    profile_photo = models.ImageField(
+    profile_photo = ContentAddressedImageField(
         upload_to=generate_user_image_path,
         blank=True,
         null=True,
     )
+    # Widths of resized photo copies by size name, None when they couldn't
+    # be made, see core.images
+    profile_photo_widths = models.JSONField(
+        blank=True, null=True, default=dict, editable=False
+    )
     address = models.ForeignKey(
         to=Address,
         on_delete=models.SET_NULL,
@@ -90,11 +100,67 @@ class Cart(models.Model):
     user = models.OneToOneField(to=get_user_model(), on_delete=models.CASCADE)
 
 
+class CartItemQuerySet(models.QuerySet):
+    def add_to_cart(self, user, product, quantity):
+        """
+        Create user's cart item or increase quantity of the existing one
+        in a single statement which is safe under concurrent adds. The cart
+        is share locked first so it waits for bulk operations holding it
+        """
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        cart_table = connection.ops.quote_name(Cart._meta.db_table)
+        sql = f"""
+            INSERT INTO {table} (cart_id, product_id, quantity)
+            SELECT id, %s, %s FROM {cart_table} WHERE user_id = %s
+            FOR KEY SHARE
+            ON CONFLICT (cart_id, product_id)
+            DO UPDATE SET quantity = {table}.quantity + EXCLUDED.quantity
+            RETURNING id, cart_id, product_id, quantity
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [product.pk, quantity, user.pk])
+            row = cursor.fetchone()
+
+        if row is None:
+            raise Cart.DoesNotExist("User has no cart!")
+        field_names = ["id", "cart_id", "product_id", "quantity"]
+        return self.model.from_db(self.db, field_names, row)
+
+    def summary(self):
+        """Aggregate cart totals and out of stock items in a single query"""
+        return self.aggregate(
+            item_count=Count("id"),
+            total_quantity=Coalesce(Sum("quantity"), 0),
+            subtotal=Coalesce(
+                Sum(F("quantity") * F("product__price")),
+                Decimal(0),
+                output_field=models.DecimalField(),
+            ),
+            out_of_stock=ArrayAgg(
+                "id",
+                filter=Q(quantity__gt=F("product__stock")),
+                ordering="id",
+                default=Value([]),
+            ),
+        )
+
+
 class CartItem(models.Model):
     cart = models.ForeignKey(to=Cart, on_delete=models.CASCADE)
     product = models.ForeignKey(to=Product, on_delete=models.CASCADE)
     quantity = models.IntegerField(validators=[MinValueValidator(1)])
 
+    objects = CartItemQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Ensure the product is only once in the cart
+            models.UniqueConstraint(
+                fields=["cart", "product"], name="unique_cart_product"
+            )
+        ]
+
 
 class WishItem(models.Model):
     user = models.ForeignKey(to=get_user_model(), on_delete=models.CASCADE)
@@ -2,8 +2,11 @@ from django.db import transaction
 from django.db.utils import IntegrityError
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
-from .models import Address, CartItem, WishItem
+from core.images import ImageDerivativesMixin, ImageSrcsetField, ImageStatusField
+from core.uploads import BoundedImageUploadMixin
+from .models import Address, Cart, CartItem, WishItem
 from .tests.test_models import create_user
+from product.models import Product
 from product.serializers import ProductSerializer
 
 
@@ -32,12 +35,14 @@ class UserRegisterSerializer(serializers.ModelSerializer):
 
 class UserSerializer(UserRegisterSerializer):
     address = AddressSerializer(required=False)
+    profile_photo_srcset = ImageSrcsetField("profile_photo")
 
     class Meta(UserRegisterSerializer.Meta):
         fields = UserRegisterSerializer.Meta.fields + [
             "id",
             "surname",
             "profile_photo",
+            "profile_photo_srcset",
             "address",
         ]
         read_only_fields = ["id", "profile_photo"]
@@ -88,10 +93,16 @@ class UserSerializer(UserRegisterSerializer):
 
 
 # Simplified one to return only user id and image in response
-class UserImageSerializer(serializers.ModelSerializer):
+class UserImageSerializer(
+    BoundedImageUploadMixin, ImageDerivativesMixin, serializers.ModelSerializer
+):
+    profile_photo_srcset = ImageSrcsetField("profile_photo")
+    profile_photo_status = ImageStatusField("profile_photo")
+    image_field = "profile_photo"
+
     class Meta:
         model = get_user_model()
-        fields = ["id", "profile_photo"]
+        fields = ["id", "profile_photo", "profile_photo_srcset", "profile_photo_status"]
         read_only_fields = ["id"]
         extra_kwargs = {"profile_photo": {"required": True}}
 
@@ -102,6 +113,19 @@ class CartItemSerializer(serializers.ModelSerializer):
         fields = ["id", "cart", "product", "quantity"]
         read_only_fields = ["id", "cart"]
 
+    # Creation merges same products so check only updates to another product
+    def validate(self, attrs):
+        product = attrs.get("product")
+        if self.instance is None or product in (None, self.instance.product):
+            return attrs
+
+        same_item = CartItem.objects.filter(cart=self.instance.cart_id, product=product)
+        if same_item.exists():
+            msg = "This product is already in the cart!"
+            raise serializers.ValidationError(msg)
+
+        return attrs
+
 
 class CartItemExpandedSerializer(CartItemSerializer):
     """Extended to output all product data when list, retrieve actions"""
@@ -109,6 +133,99 @@ class CartItemExpandedSerializer(CartItemSerializer):
     product = ProductSerializer()
 
 
+class CartSummarySerializer(serializers.Serializer):
+    """Cart totals computed by database"""
+
+    item_count = serializers.IntegerField()
+    total_quantity = serializers.IntegerField()
+    subtotal = serializers.DecimalField(max_digits=17, decimal_places=2)
+    out_of_stock = serializers.ListField(
+        child=serializers.IntegerField(),
+        help_text="IDs of cart items which quantity exceeds product stock",
+    )
+
+
+class CartBulkOperationSerializer(serializers.Serializer):
+    """Single add, set or remove cart operation"""
+
+    action = serializers.ChoiceField(choices=["add", "set", "remove"])
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        if attrs["action"] != "remove" and "quantity" not in attrs:
+            raise serializers.ValidationError({"quantity": "This field is required."})
+        return attrs
+
+
+class CartBulkSerializer(serializers.Serializer):
+    """Apply many cart operations at once in a single transaction"""
+
+    operations = CartBulkOperationSerializer(many=True, allow_empty=False)
+
+    def create(self, validated_data):
+        user = self.context["request"].user
+        operations = validated_data["operations"]
+        product_ids = {operation["product"] for operation in operations}
+
+        with transaction.atomic():
+            # Lock the cart so concurrent bulk requests and single adds apply
+            # one after another
+            cart = Cart.objects.select_for_update().get(user=user)
+            # Items are also updated without the cart, lock them so their
+            # quantities can't change before they are written back
+            quantities = dict(
+                cart.cartitem_set.filter(product__in=product_ids)
+                .select_for_update()
+                .values_list("product", "quantity")
+            )
+            stocks = dict(
+                Product.objects.filter(id__in=product_ids).values_list("id", "stock")
+            )
+
+            errors = [{} for _ in operations]
+            last_operation = {}
+            for i, operation in enumerate(operations):
+                product_id = operation["product"]
+                if operation["action"] == "remove":
+                    quantities.pop(product_id, None)
+                    continue
+                if product_id not in stocks:
+                    errors[i] = {"product": ["Product doesn't exist!"]}
+                    continue
+                if operation["action"] == "add":
+                    quantities[product_id] = (
+                        quantities.get(product_id, 0) + operation["quantity"]
+                    )
+                else:
+                    quantities[product_id] = operation["quantity"]
+                last_operation[product_id] = i
+
+            # Check resulting quantities of touched products against stock
+            for product_id, i in last_operation.items():
+                if quantities.get(product_id, 0) > stocks[product_id]:
+                    msg = f"Only {stocks[product_id]} items are in stock!"
+                    errors[i] = {"quantity": [msg]}
+            if any(errors):
+                raise serializers.ValidationError({"operations": errors})
+
+            CartItem.objects.bulk_create(
+                [
+                    CartItem(cart=cart, product_id=product_id, quantity=quantity)
+                    for product_id, quantity in quantities.items()
+                    if product_id in last_operation
+                ],
+                update_conflicts=True,
+                unique_fields=["cart", "product"],
+                update_fields=["quantity"],
+            )
+            cart.cartitem_set.filter(product__in=product_ids).exclude(
+                product__in=quantities
+            ).delete()
+
+        return cart
+
+
 class WishItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = WishItem
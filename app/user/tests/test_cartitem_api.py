@@ -1,4 +1,8 @@
-from django.test import TestCase
+import threading
+from decimal import Decimal
+from unittest.mock import patch
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -6,8 +10,9 @@ from .test_models import create_user, create_cartitem, create_category, create_p
 from user.models import Cart, CartItem
 from user.serializers import CartItemSerializer, CartItemExpandedSerializer
 
-
 CART_ITEM_LIST_URL = reverse("user:cartitem-list")
+CART_BULK_URL = reverse("user:cartitem-bulk")
+CART_SUMMARY_URL = reverse("user:cartitem-summary")
 
 
 def get_cartitem_detail_url(cartitem_id):
@@ -50,6 +55,29 @@ class PrivateCartItemAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data["results"], serializer.data)
 
+    def test_list_cartitems_query_count(self):
+        """Test listing cart items runs fixed number of queries"""
+        category = create_category()
+        for _ in range(5):
+            create_cartitem(self.cart, create_product(category))
+
+        # Count and page queries only, no query per product
+        with self.assertNumQueries(2):
+            res = self.client.get(CART_ITEM_LIST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 5)
+
+    def test_retrieve_cartitem_query_count(self):
+        """Test retrieving cart item runs a single query"""
+        category = create_category()
+        cart_item = create_cartitem(self.cart, create_product(category))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(get_cartitem_detail_url(cart_item.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
     def test_cartitems_limited_to_user(self):
         """Test user can only deal with his own cart items"""
         other_user = create_user("other@example.com")
@@ -100,6 +128,35 @@ class PrivateCartItemAPITests(TestCase):
         self.assertEqual(cart_item.product, prod)
         self.assertEqual(cart_item.quantity, payload["quantity"])
 
+    def test_create_same_product_merges(self):
+        """Test adding product already in the cart increases its quantity"""
+        category = create_category()
+        prod = create_product(category)
+        cart_item = create_cartitem(self.cart, prod, quantity=2)
+
+        payload = {"product": prod.id, "quantity": 3}
+        res = self.client.post(CART_ITEM_LIST_URL, payload)
+
+        cart_item.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["id"], cart_item.id)
+        self.assertEqual(res.data["quantity"], 5)
+        self.assertEqual(cart_item.quantity, 5)
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 1)
+
+    def test_update_to_product_in_cart_error(self):
+        """Test changing item product to one already in the cart"""
+        category = create_category()
+        prod1 = create_product(category)
+        prod2 = create_product(category)
+        cart_item = create_cartitem(self.cart, prod1)
+        create_cartitem(self.cart, prod2)
+
+        url = get_cartitem_detail_url(cart_item.id)
+        res = self.client.patch(url, {"product": prod2.id})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_partial_update_cartitem(self):
         """Test partial updating cart item"""
         category = create_category()
@@ -142,3 +199,136 @@ class PrivateCartItemAPITests(TestCase):
         res = self.client.delete(url)
 
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_bulk_operations(self):
+        """Test applying add, set and remove operations at once"""
+        category = create_category()
+        prod1 = create_product(category)
+        prod2 = create_product(category)
+        prod3 = create_product(category)
+        prod4 = create_product(category)
+        create_cartitem(self.cart, prod1, quantity=1)
+        create_cartitem(self.cart, prod2, quantity=1)
+        create_cartitem(self.cart, prod3, quantity=1)
+
+        payload = {
+            "operations": [
+                {"action": "add", "product": prod1.id, "quantity": 2},
+                {"action": "set", "product": prod2.id, "quantity": 5},
+                {"action": "remove", "product": prod3.id},
+                {"action": "add", "product": prod4.id, "quantity": 1},
+            ]
+        }
+        res = self.client.post(CART_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        cart_items = CartItem.objects.filter(cart=self.cart).order_by("id")
+        serializer = CartItemExpandedSerializer(cart_items, many=True)
+        self.assertEqual(res.data, serializer.data)
+        quantities = dict(cart_items.values_list("product", "quantity"))
+        self.assertEqual(quantities, {prod1.id: 3, prod2.id: 5, prod4.id: 1})
+
+    def test_bulk_operations_errors(self):
+        """Test no operation applied when any of them is invalid"""
+        category = create_category()
+        prod1 = create_product(category, stock=3)
+        prod2 = create_product(category)
+        create_cartitem(self.cart, prod1, quantity=2)
+
+        payload = {
+            "operations": [
+                {"action": "remove", "product": prod2.id},
+                {"action": "add", "product": prod1.id, "quantity": 2},
+                {"action": "set", "product": 0, "quantity": 1},
+            ]
+        }
+        res = self.client.post(CART_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = res.data["operations"]
+        self.assertEqual(errors[0], {})
+        self.assertIn("quantity", errors[1])
+        self.assertIn("product", errors[2])
+        cart_item = CartItem.objects.get(cart=self.cart)
+        self.assertEqual(cart_item.quantity, 2)
+
+    def test_cart_summary(self):
+        """Test getting cart totals computed in a single query"""
+        category = create_category()
+        prod1 = create_product(category, price=Decimal("10.50"), stock=5)
+        prod2 = create_product(category, price=Decimal("3.00"), stock=1)
+        create_cartitem(self.cart, prod1, quantity=2)
+        out_of_stock_item = create_cartitem(self.cart, prod2, quantity=3)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(CART_SUMMARY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["item_count"], 2)
+        self.assertEqual(res.data["total_quantity"], 5)
+        self.assertEqual(res.data["subtotal"], "30.00")
+        self.assertEqual(res.data["out_of_stock"], [out_of_stock_item.id])
+
+    def test_list_with_summary(self):
+        """Test including cart totals in list response"""
+        res = self.client.get(CART_ITEM_LIST_URL, {"include": "summary"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["summary"],
+            {
+                "item_count": 0,
+                "total_quantity": 0,
+                "subtotal": "0.00",
+                "out_of_stock": [],
+            },
+        )
+
+
+class ConcurrentCartBulkTests(TransactionTestCase):
+    """Test bulk cart operations run alongside single adds"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.cart = Cart.objects.get(user=self.user)
+        self.product = create_product(create_category())
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def bulk_add_with_concurrent_add(self):
+        """Add the product from another connection once bulk read quantities"""
+
+        def add_to_cart():
+            CartItem.objects.add_to_cart(self.user, self.product, 1)
+            connection.close()
+
+        thread = threading.Thread(target=add_to_cart)
+        bulk_create = CartItem.objects.bulk_create
+
+        def add_before_write(*args, **kwargs):
+            thread.start()
+            thread.join(0.5)
+            return bulk_create(*args, **kwargs)
+
+        payload = {
+            "operations": [{"action": "add", "product": self.product.id, "quantity": 2}]
+        }
+        with patch.object(CartItem.objects, "bulk_create", add_before_write):
+            res = self.client.post(CART_BULK_URL, payload, format="json")
+        thread.join()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return CartItem.objects.get(cart=self.cart)
+
+    def test_add_to_existing_item_kept(self):
+        """Test add landing between bulk read and write isn't overwritten"""
+        create_cartitem(self.cart, self.product, quantity=1)
+        cart_item = self.bulk_add_with_concurrent_add()
+
+        self.assertEqual(cart_item.quantity, 4)
+
+    def test_add_of_new_item_kept(self):
+        """Test add inserting the item bulk is about to create"""
+        cart_item = self.bulk_add_with_concurrent_add()
+
+        self.assertEqual(cart_item.quantity, 3)
@@ -9,6 +9,7 @@ from django.core.files import File
 from rest_framework import status
 from rest_framework.test import APIClient
 from .test_models import create_user
+from jobs.queue import work
 from user.serializers import UserSerializer
 
 ME_URL = reverse("user:me")
@@ -99,6 +100,12 @@ class PrivateProfileAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIn("profile_photo", res.data)
         self.assertTrue(os.path.exists(self.user.profile_photo.path))
+        self.assertEqual(res.data["profile_photo_status"], "pending")
+
+        work(burst=True)
+        self.user.refresh_from_db()
+        res = self.client.get(ME_URL)
+        self.assertIn("_thumbnail.jpg 10w", res.data["profile_photo_srcset"]["jpeg"])
 
     def test_upload_image_bad_request(self):
         """Test invalid payload error"""
@@ -129,6 +136,7 @@ class PrivateProfileAPITests(TestCase):
 
         self.user.refresh_from_db()
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data["profile_photo_srcset"])
         # Ensure there is no more image path
         with self.assertRaises(ValueError):
             os.path.exists(self.user.profile_photo.path)
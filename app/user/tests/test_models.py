@@ -147,17 +147,25 @@ class CartItemModelTests(TestCase):
     # Merge same cart items by increasing quantity
     def test_merge_same_cartitems(self):
         """Test merging two same cartitems"""
-        first = create_cartitem(self.cart, self.prod, 1)
-        create_cartitem(self.cart, self.prod, 1)
+        first = CartItem.objects.add_to_cart(self.cart.user, self.prod, 1)
+        second = CartItem.objects.add_to_cart(self.cart.user, self.prod, 2)
 
         first.refresh_from_db()
-        self.assertEqual(first.quantity, 2)
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(first.quantity, 3)
+        self.assertEqual(second.quantity, 3)
         cartitem_count = CartItem.objects.filter(
             cart=self.cart,
             product=self.prod,
         ).count()
         self.assertEqual(cartitem_count, 1)
 
+    def test_cartitem_duplication_error(self):
+        """Test duplicating cart and product fields raises error"""
+        with self.assertRaises(IntegrityError):
+            create_cartitem(self.cart, self.prod)
+            create_cartitem(self.cart, self.prod)
+
 
 class WishItemModelTests(TestCase):
     """Test WishItem model"""
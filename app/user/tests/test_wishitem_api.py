@@ -57,6 +57,29 @@ class PrivateWishItemAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data["results"], serializer.data)
 
+    def test_list_wishitems_query_count(self):
+        """Test listing wish items runs fixed number of queries"""
+        category = create_category()
+        for _ in range(5):
+            create_wishitem(self.user, create_product(category))
+
+        # Count and page queries only, no query per product
+        with self.assertNumQueries(2):
+            res = self.client.get(WISH_ITEM_LIST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 5)
+
+    def test_retrieve_wishitem_query_count(self):
+        """Test retrieving wish item runs a single query"""
+        category = create_category()
+        wish_item = create_wishitem(self.user, create_product(category))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(get_wishitem_detail_url(wish_item.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
     def test_wishitems_limited_to_user(self):
         """Test user can only deal with his own wish items"""
         other_user = create_user("other@example.com")
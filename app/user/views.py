@@ -6,22 +6,31 @@ from rest_framework import mixins
 from rest_framework import permissions
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, JSONParser
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
     OpenApiParameter,
     OpenApiTypes,
 )
+from core.pagination import EstimatedCountPagination
+from core.uploads import ImageUploadParser
+from authentication.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
 from .serializers import (
     UserSerializer,
     UserImageSerializer,
     CartItemSerializer,
     CartItemExpandedSerializer,
+    CartBulkSerializer,
+    CartSummarySerializer,
     WishItemSerializer,
     WishItemExpandedSerializer,
 )
-from .models import Cart, WishItem
+from .models import CartItem, WishItem
 
 
 @extend_schema_view(
@@ -44,6 +53,7 @@ class UserListRetrieveViewSet(
 
     serializer_class = UserSerializer
     queryset = get_user_model().objects.all().order_by("id")
+    pagination_class = EstimatedCountPagination
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ["created_at"]
 
@@ -52,7 +62,7 @@ class ProfileRUDView(generics.RetrieveUpdateDestroyAPIView):
     """Manage user profile retrieve, update, destroy operations"""
 
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SignedTokenAuthentication]
     serializer_class = UserSerializer
 
     def get_object(self):
@@ -63,8 +73,10 @@ class ProfileImageAPIView(views.APIView):
     """Manage User profile image uploading"""
 
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SignedTokenAuthentication]
     serializer_class = UserImageSerializer
+    # Image is checked while received instead of spooled to a temporary file
+    parser_classes = [JSONParser, FormParser, ImageUploadParser]
 
     def post(self, request):
         image_serializer = self.serializer_class(
@@ -76,28 +88,78 @@ class ProfileImageAPIView(views.APIView):
         return Response(data=image_serializer.data, status=status.HTTP_200_OK)
 
 
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "include",
+                OpenApiTypes.STR,
+                description="Pass `summary` to include cart totals in response",
+            ),
+        ]
+    )
+)
 class CartItemViewSet(viewsets.ModelViewSet):
     """Manage cart items"""
 
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SignedTokenAuthentication]
     serializer_class = CartItemSerializer
 
-    # Limit cart items to user
+    # Limit cart items to user. Join products in the same query
+    # since they are serialized along with cart items.
+    # Filter by user id so signed token users aren't loaded from db
     def get_queryset(self):
-        cart = Cart.objects.get(user=self.request.user)
-        return cart.cartitem_set.all().order_by("id")
+        return (
+            CartItem.objects.filter(cart__user=self.request.user.pk)
+            .select_related("product")
+            .order_by("id")
+        )
 
     def get_serializer_class(self):
         # Expand product data when list and retrieve actions
         if self.action in ["list", "retrieve"]:
             return CartItemExpandedSerializer
+        elif self.action == "bulk":
+            return CartBulkSerializer
+        elif self.action == "summary":
+            return CartSummarySerializer
         return super().get_serializer_class()
 
-    # Associate cart item with user's cart by default
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # Return cart totals along with items when requested
+        if "summary" in request.query_params.get("include", "").split(","):
+            summary = self.get_queryset().summary()
+            response.data["summary"] = CartSummarySerializer(summary).data
+        return response
+
+    # Cart totals are computed with a single aggregate query
+    @action(["get"], detail=False)
+    def summary(self, request):
+        """Get cart item count, total quantity, subtotal and out of stock items"""
+        summary_serializer = self.get_serializer(self.get_queryset().summary())
+        return Response(summary_serializer.data, status.HTTP_200_OK)
+
+    # Apply many add, set, remove operations at once to sync the cart
+    @extend_schema(responses=CartItemExpandedSerializer(many=True))
+    @action(["post"], detail=False)
+    def bulk(self, request):
+        """Add, set quantity of or remove many cart items in one transaction"""
+        bulk_serializer = self.get_serializer(data=request.data)
+        bulk_serializer.is_valid(raise_exception=True)
+        bulk_serializer.save()
+        cart_serializer = CartItemExpandedSerializer(self.get_queryset(), many=True)
+        return Response(cart_serializer.data, status.HTTP_200_OK)
+
+    # Add product to user's cart or increase quantity of existing item
+    # with a single upsert statement
     def perform_create(self, serializer):
-        cart = Cart.objects.get(user=self.request.user)
-        serializer.save(cart=cart)
+        serializer.instance = CartItem.objects.add_to_cart(
+            user=self.request.user,
+            product=serializer.validated_data["product"],
+            quantity=serializer.validated_data["quantity"],
+        )
 
 
 class WishItemViewSet(
@@ -110,13 +172,13 @@ class WishItemViewSet(
     """Manage whish items"""
 
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SignedTokenAuthentication]
     serializer_class = WishItemSerializer
 
     # Limit wish items to user
     def get_queryset(self):
-        user = self.request.user
-        return user.wishitem_set.all().order_by("id")
+        wish_items = WishItem.objects.filter(user=self.request.user.pk)
+        return wish_items.select_related("product").order_by("id")
 
     def get_serializer_class(self):
         # Expand product data when list and retrieve actions
@@ -25,6 +25,7 @@ export default function Carousel() {
         <Item 
           key={index} 
           image={item.image} 
+          srcset={item.image_srcset}
           title={item.title} 
           price={item.price}
           active={index === currentIndex}
@@ -1,14 +1,24 @@
 import './Item.scss';
 
 
-function Item({image, title, price, active}) {
+function Item({image, srcset, title, price, active}) {
   return (
     <div className= 'item slide'>
-        <img className={`slide ${active ? 'active' : ''} item-img`} src={image} alt="image of clothes" />
+        <picture>
+          {srcset && <source type="image/webp" srcSet={srcset.webp} sizes="285px" />}
+          <img
+            className={`slide ${active ? 'active' : ''} item-img`}
+            src={image}
+            srcSet={srcset?.jpeg}
+            sizes="285px"
+            loading="lazy"
+            alt="image of clothes"
+          />
+        </picture>
         <p className='item-title'> {title} </p>
         <p className='item-price'> ${price} </p>
     </div>
   )
 }
 
-export default Item
\ No newline at end of file
+export default Item